@@ -1,17 +1,22 @@
+import argparse
+import logging
 import traceback
 
 from flask import Flask, render_template, request
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileRequired, FileAllowed
 from transpiler import generator
+from transpiler.constants import LOG_FORMAT, PARSER_BACKENDS
 import os
 
+logging.basicConfig(format=LOG_FORMAT, level=os.getenv('LOG_LEVEL', logging.WARNING))
 
 SECRET_KEY = os.urandom(32)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = SECRET_KEY
 app.config['UPLOAD_FOLDER'] = 'example'
+app.config['PARSER'] = 'auto'
 
 
 class UploadForm(FlaskForm):
@@ -63,4 +68,7 @@ def main():
 
 
 if __name__ == '__main__':
+    arguments = argparse.ArgumentParser()
+    arguments.add_argument('--parser', choices=PARSER_BACKENDS, default='auto')
+    app.config['PARSER'] = arguments.parse_args().parser
     app.run(host="0.0.0.0")
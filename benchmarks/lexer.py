@@ -0,0 +1,133 @@
+"""
+Lexer throughput on the example programs scaled up.
+
+Run from the project root: python -m benchmarks.lexer
+"""
+import glob
+import re
+import time
+
+from transpiler.constants import Tag, LEXER_RULES, WHITESPACE
+from transpiler.lexer.lexer import Lexer, LexerError
+from transpiler.lexer.tables import LexerTables
+
+SCALE = 500
+REPEATS = 3
+SMALL_DOCUMENTS = 2000
+
+
+def load_examples():
+    sources = []
+    for path in sorted(glob.glob('example/*.java')):
+        with open(path) as f:
+            code = f.read()
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        try:
+            list(lexer.tokens)
+        except LexerError:
+            continue
+        sources.append(code)
+    return '\n'.join(sources) * SCALE
+
+
+def tokenize_alternation(code):
+    """
+    The original scheme: every rule in one prioritized alternation, tag built by the enum constructor.
+    """
+    regex = re.compile('|'.join(f'(?P<{rule.tag.value}>{rule.regex})' for rule in LEXER_RULES))
+    tokens = []
+    pos = 0
+    while cursor := WHITESPACE.search(code, pos):
+        cursor = regex.match(code, cursor.start())
+        tokens.append((Tag(cursor.lastgroup), cursor.group(cursor.lastgroup)))
+        pos = cursor.end()
+    return tokens
+
+
+def tokenize_keywords(code):
+    """
+    The same loop over the Lexer tables: pattern alternation plus keyword dict.
+    """
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    tokens = []
+    pos = 0
+    while cursor := WHITESPACE.search(code, pos):
+        cursor = lexer.regex.match(code, cursor.start())
+        tokens.append((lexer.tags[lexer._get_tag_id(cursor)], cursor.group()))
+        pos = cursor.end()
+    return tokens
+
+
+def tokenize_lexer(code):
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    return list(lexer.tokens)
+
+
+def tokenize_buffer(code):
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    return lexer.tokenize_buffer()
+
+
+def tokenize_parallel(code):
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    return lexer.tokenize_parallel(threshold=0)
+
+
+def measure_relex(code):
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    tokens = list(lexer.tokens)
+    middle = code.index(';', len(code) // 2)
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        tokens = lexer.relex(tokens, middle, middle, ' a')
+        tokens = lexer.relex(tokens, middle, middle + 2, '')
+    elapsed = (time.perf_counter() - start) / (2 * REPEATS)
+    print(f'{"Lexer.relex keystroke":<24} {len(tokens):>8} tokens {elapsed * 1000:>12.2f} ms/edit')
+
+
+def measure_small(code):
+    """
+    Many one-statement documents, each lexed by its own Lexer: cached tables against rebuilding them.
+    """
+    documents = [f'{line};' for line in code.split(';')[:SMALL_DOCUMENTS]]
+    for name, tables in (('small docs, cached', None), ('small docs, rebuilt', LexerTables)):
+        start = time.perf_counter()
+        for document in documents:
+            if tables is not None:
+                tables(LEXER_RULES)
+            lexer = Lexer(Tag, LEXER_RULES)
+            lexer.buffer = document
+            list(lexer.tokens)
+        elapsed = (time.perf_counter() - start) / len(documents)
+        print(f'{name:<24} {len(documents):>8} docs   {elapsed * 1e6:>12.2f} us/doc')
+
+
+def measure(name, tokenize, code):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        count = len(tokenize(code))
+        best = min(best, time.perf_counter() - start)
+    print(f'{name:<24} {count:>8} tokens {count / best:>12,.0f} tokens/s')
+
+
+def main():
+    code = load_examples()
+    measure('single alternation', tokenize_alternation, code)
+    measure('keyword table', tokenize_keywords, code)
+    measure('Lexer.tokens', tokenize_lexer, code)
+    measure('Lexer.tokenize_buffer', tokenize_buffer, code)
+    measure('Lexer.tokenize_parallel', tokenize_parallel, code)
+    measure_relex(code)
+    measure_small(code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Earley parser throughput on generated programs of growing size.
+
+Run from the project root: python -m benchmarks.syntaxer
+Peak memory of one large parse and recognition: python -m benchmarks.syntaxer memory
+Semantic analysis and code generation on deep trees: python -m benchmarks.syntaxer walk
+Chart size with the grammar as written and normalized: python -m benchmarks.syntaxer normalize
+Reparsing after an edit near the end of the program: python -m benchmarks.syntaxer reparse
+Whole and per-method parallel parsing of many methods: python -m benchmarks.syntaxer parallel
+Memory and traversal of syntax trees against nltk trees: python -m benchmarks.syntaxer cst
+"""
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from nltk.tree import Tree
+
+from transpiler.constants import Tag, LEXER_RULES
+from transpiler.generator.generator import Generator
+from transpiler.lexer.lexer import Lexer
+from transpiler.semantixer.semantixer import SemanticAnalyzer
+from transpiler.syntaxer.cst import SyntaxTree
+from transpiler.syntaxer.earley import CompiledGrammar, EarleyParse, Grammar
+from transpiler.syntaxer.methods import MethodParse
+
+GRAMMAR = 'example/grammar.txt'
+SIZES = (100, 200, 400)
+MEMORY_STATEMENTS = 2000
+WALK_SIZES = (1000, 10000, 100000)
+METHODS = (4, 16, 64)
+METHOD_STATEMENTS = 60
+STATEMENTS = (
+    'int a{i} = {i} + 2 * (a - 1);',
+    'if (a{i} > 3 && b || c) {{ a{i} += 1; }} else {{ b = max(a, 2); }}',
+    "char c{i} = 'x';",
+    'for (int j = 0; j < 10; j++) {{ System.out.println(j); }}',
+    'while (i < n) {{ i += 1; {{ k--; }} }}',
+    'a{i} = plus(a, b, 3) - 4 / 2;',
+)
+
+
+def make_program(statements: int) -> str:
+    body = '\n'.join(STATEMENTS[i % len(STATEMENTS)].format(i=i) for i in range(statements))
+    return (
+        'public class Main {\n'
+        '    public static int plus(int a, int b) { return a + b; }\n'
+        '    public static void main(String[] args) {\n' + body + '\n    }\n}\n'
+    )
+
+
+def tokenize(code):
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    return list(lexer.tokens)
+
+
+def measure(grammar, statements):
+    tokens = tokenize(make_program(statements))
+    start = time.perf_counter()
+    earley = EarleyParse(tokens, grammar)
+    tree = earley.get_parse_tree()
+    elapsed = time.perf_counter() - start
+    assert tree is not None
+    states = sum(len(entry) for entry in earley.chart)
+    print(f'{statements:>6} statements {len(tokens):>8} tokens {states:>10} states '
+          f'{elapsed:>8.2f} s {states / elapsed:>12,.0f} states/s')
+
+
+def measure_memory(grammar, statements):
+    tokens = tokenize(make_program(statements))
+    for recognize in (False, True):
+        tracemalloc.start()
+        start = time.perf_counter()
+        earley = EarleyParse(tokens, grammar)
+        valid = earley.recognize() if recognize else earley.get_parse_tree() is not None
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert valid
+        print(f'{"recognize" if recognize else "parse":>9} {statements:>6} statements {len(tokens):>8} tokens '
+              f'{elapsed:>8.2f} s {peak / 2 ** 20:>10.1f} MiB peak')
+
+
+def make_deep_tree(grammar, statements):
+    """
+    Tree of a main function with one declaration and `statements` increments, each nested one code block deeper.
+
+    Only two statements are parsed, the increment is chained to the full depth afterwards.
+    """
+    tree = EarleyParse(tokenize(make_program(0).replace('\n    }', 'int a = 0; a += 1;\n    }')), grammar).get_parse_tree()
+    tree = tree.to_nltk()
+    main_block = next(subtree for subtree in tree[5] if subtree.label() == '<code_block>')
+    increment = main_block[1, 0]
+    block = Tree('<code_block>', [increment])
+    for _ in range(statements - 1):
+        block = Tree('<code_block>', [increment, block])
+    main_block[1] = block
+    return SyntaxTree.from_nltk(tree).root
+
+
+def measure_walk(grammar, statements):
+    tree = make_deep_tree(grammar, statements)
+    start = time.perf_counter()
+    assert SemanticAnalyzer().is_correct(tree)
+    analyzed = time.perf_counter()
+    Generator().generate_code(tree)
+    generated = time.perf_counter()
+    print(f'{statements:>6} statements {analyzed - start:>8.2f} s semantic analysis '
+          f'{generated - analyzed:>8.2f} s code generation')
+
+
+def measure_normalization(statements):
+    tokens = tokenize(make_program(statements))
+    grammar = Grammar.load_grammar(GRAMMAR)
+    for normalize in (False, True):
+        compiled = grammar.compile(normalize)
+        start = time.perf_counter()
+        earley = EarleyParse(tokens, compiled)
+        assert earley.get_parse_tree() is not None
+        elapsed = time.perf_counter() - start
+        states = sum(len(entry) for entry in earley.chart)
+        print(f'{"normalized" if normalize else "as written":>10} {len(compiled.productions):>5} rules '
+              f'{statements:>6} statements {states / len(earley.chart):>8.2f} states per entry {elapsed:>8.2f} s')
+
+
+def measure_reparse(grammar, statements):
+    lines = make_program(statements).split('\n')
+    # an `int a{i} = {i} + 2 * (a - 1);` statement four fifths into the body
+    line = 3 + statements * 4 // 5 // len(STATEMENTS) * len(STATEMENTS)
+    for edit in ('a', '+'):
+        edited = lines[:line] + [lines[line].replace(edit, '*' if edit == '+' else 'b', 1)] + lines[line + 1:]
+        tokens = tokenize('\n'.join(edited))
+        earley = EarleyParse(tokenize('\n'.join(lines)), grammar)
+        assert earley.get_parse_tree() is not None
+        start = time.perf_counter()
+        assert earley.reparse(tokens) is not None
+        reparsed = time.perf_counter()
+        assert EarleyParse(tokens, grammar).get_parse_tree() is not None
+        parsed = time.perf_counter()
+        print(f'{statements:>6} statements edit {edit!r} at line {line + 1:>5} {reparsed - start:>8.2f} s reparse '
+              f'{parsed - reparsed:>8.2f} s full parse')
+
+
+def make_methods(methods: int, statements: int) -> str:
+    body = '\n'.join(STATEMENTS[i % len(STATEMENTS)].format(i=i) for i in range(statements))
+    declarations = ''.join(f'    public static int f{j}(int a, int b) {{\n{body}\nreturn a;\n    }}\n' for j in range(methods))
+    return f'public class Main {{\n{declarations}    public static void main(String[] args) {{\n{body}\n    }}\n}}\n'
+
+
+def measure_parallel(grammar, methods):
+    tokens = tokenize(make_methods(methods, METHOD_STATEMENTS))
+    start = time.perf_counter()
+    assert EarleyParse(tokens, grammar).get_parse_tree() is not None
+    parsed = time.perf_counter()
+    assert MethodParse(tokens, grammar, threshold=0).get_parse_tree() is not None
+    split = time.perf_counter()
+    print(f'{methods:>6} methods {len(tokens):>8} tokens {parsed - start:>8.2f} s whole '
+          f'{split - parsed:>8.2f} s per method')
+
+
+def measure_cst(grammar, statements):
+    tree = EarleyParse(tokenize(make_program(statements)), grammar).get_parse_tree()
+    for name, convert in (('cst', lambda: SyntaxTree.from_nltk(tree.to_nltk()).root), ('nltk', tree.to_nltk)):
+        tracemalloc.start()
+        converted = convert()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        nodes = sum(1 for _ in converted.subtrees())
+        walked = time.perf_counter()
+        leaves = sum(len(subtree.leaves()) for subtree in converted.subtrees())
+        collected = time.perf_counter()
+        print(f'{name:>4} {statements:>6} statements {nodes:>8} nodes {size / 2 ** 20:>8.1f} MiB '
+              f'{walked - start:>8.3f} s subtrees {collected - walked:>8.3f} s leaves of {leaves:>10} tokens')
+
+
+def measure_import():
+    for module in ('transpiler.generator', 'nltk'):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], check=True)
+        print(f'{module:>20} {time.perf_counter() - start:>8.2f} s import')
+
+
+def main():
+    grammar = CompiledGrammar.load(GRAMMAR)
+    if sys.argv[1:] == ['memory']:
+        measure_memory(grammar, MEMORY_STATEMENTS)
+        return
+    if sys.argv[1:] == ['normalize']:
+        for statements in SIZES:
+            measure_normalization(statements)
+        return
+    if sys.argv[1:] == ['parallel']:
+        for methods in METHODS:
+            measure_parallel(grammar, methods)
+        return
+    if sys.argv[1:] == ['reparse']:
+        for statements in SIZES:
+            measure_reparse(grammar, statements)
+        return
+    if sys.argv[1:] == ['cst']:
+        for statements in SIZES:
+            measure_cst(grammar, statements)
+        measure_import()
+        return
+    if sys.argv[1:] == ['walk']:
+        for statements in WALK_SIZES:
+            measure_walk(grammar, statements)
+        return
+    for statements in SIZES:
+        measure(grammar, statements)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,6 @@ public class Main
     int da = 123 / 3;
     int net = 456 * 1000;
 
-    integer lol_kek = plus(lol, kek);
+    int lol_kek = plus(lol, kek) ^ 2;
 	}
 }
@@ -1,6 +1,6 @@
 from unittest import TestCase, main
 from tests.semantixer_tests import SemantixerTestCase
-from tests.syntaxer_tests import SyntaxerExceptionsTestCase
+from tests.syntaxer_tests import SyntaxerExceptionsTestCase, LALRTestCase
 from tests.generator_tests import GeneratorTestCase
 from tests.lexer_tests import LexerTestCase
 
@@ -1,10 +1,17 @@
 import logging
+import os
+import shutil
+import tempfile
 import unittest
+from types import SimpleNamespace
+from nltk.tree import Tree
 from transpiler.constants import Tag, LEXER_RULES
-from transpiler.lexer.lexer import Lexer
+from transpiler.lexer.lexer import Lexer, UnexpectedTokensError
 from transpiler.syntaxer.earley import Grammar, EarleyParse
 from transpiler.semantixer.semantixer import SemanticAnalyzer
+from transpiler.generator import compiler
 from transpiler.generator.generator import Generator
+from transpiler.syntaxer.cst import SyntaxTree
 
 logger = logging.getLogger(__name__)
 
@@ -409,6 +416,57 @@ void main(int argc, char *argv[])
 }
 """)
 
+    def test_compiler(self):
+        with open('../example/text.txt') as f:
+            code = f.read()
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        tree = EarleyParse(list(lexer.tokens), Grammar.load_grammar('../example/grammar.txt')).get_parse_tree()
+        self.assertTrue(SemanticAnalyzer().is_correct(tree))
+        for parser in ('earley', 'auto', 'parallel'):
+            app = SimpleNamespace(config={'UPLOAD_FOLDER': '../example', 'PARSER': parser})
+            self.assertEqual(compiler(app), Generator().generate_code(tree))
+
+    def test_compiler_lexer_errors(self):
+        code = ('public class Main {\n    public static void main(String[] args) {\n'
+                '        int x = 1 @ 2;\n        int y = 3 $;\n    }\n}\n')
+        with tempfile.TemporaryDirectory() as folder:
+            shutil.copy('../example/grammar.txt', folder)
+            with open(os.path.join(folder, 'text.txt'), 'w') as f:
+                f.write(code)
+            for parser in ('earley', 'auto'):
+                with self.assertRaises(UnexpectedTokensError) as error:
+                    compiler(SimpleNamespace(config={'UPLOAD_FOLDER': folder, 'PARSER': parser}))
+                self.assertEqual([token_error.char for token_error in error.exception.errors], ['@', '$'])
+
+    def test_deep_code_block(self):
+        statements = 100000
+        self.lexer = Lexer(Tag, LEXER_RULES)
+        self.lexer.buffer = """
+public class Main
+{
+    public static void main(String[] args) {
+        int a = 0;
+        a += 1;
+    }
+}
+"""
+        tree = EarleyParse(list(self.lexer.tokens), Grammar.load_grammar('../example/grammar.txt')).get_parse_tree()
+        # main body is the declaration followed by a block with the increment, which is chained to the full depth
+        tree = tree.to_nltk()
+        main_block = tree[4, 8]
+        increment = main_block[1, 0]
+        block = Tree('<code_block>', [increment])
+        for _ in range(statements - 1):
+            block = Tree('<code_block>', [increment, block])
+        main_block[1] = block
+        tree = SyntaxTree.from_nltk(tree).root
+
+        self.assertTrue(SemanticAnalyzer().is_correct(tree))
+        generated_code = Generator().generate_code(tree)
+        self.assertEqual(generated_code.count('    a += 1;\n'), statements)
+        self.assertTrue(generated_code.endswith('    a += 1;\n}\n'))
+
     def test_all_inclusive(self):
         self.check_generator("""
 public class Main
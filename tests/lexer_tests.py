@@ -1,7 +1,14 @@
+import io
 import logging
+import os
+import random
+import tempfile
+import threading
+import time
 import unittest
 from transpiler.constants import Tag, LEXER_RULES
-from transpiler.lexer.lexer import Lexer, LexerError
+from transpiler.lexer.lexer import Lexer, LexerError, UnexpectedTokensError
+from transpiler.lexer.tracer import LexerTracer
 
 
 class LexerTestCase(unittest.TestCase):
@@ -221,6 +228,214 @@ class LexerTestCase(unittest.TestCase):
         self.assertEqual(tokens[0].tag, Tag.RETURN)
         self.assertEqual(tokens[1].tag, Tag.ID)
 
+    def test_keywords(self):
+        code = "int boolean if true Main main integer booleans iffy trueish Mainly"
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        tokens = list(lexer.tokens)
+        self.assertEqual(
+            [token.tag for token in tokens],
+            [Tag.TYPE_HINT, Tag.TYPE_HINT, Tag.IF, Tag.BOOLEAN_VALUE, Tag.MAIN, Tag.MAIN] + [Tag.ID] * 5,
+        )
+
+    def test_line_numbers(self):
+        code = "int a = 1;\n\n  a++;\n}"
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        tokens = list(lexer.tokens)
+        self.assertEqual([token.line for token in tokens], [1, 1, 1, 1, 1, 3, 3, 3, 4])
+
+    def test_linear_scaling(self):
+        def tokenize_lines(count):
+            lexer = Lexer(Tag, LEXER_RULES)
+            lexer.buffer = 'int a = 1;\n' * count
+            start = time.perf_counter()
+            tokens = list(lexer.tokens)
+            elapsed = time.perf_counter() - start
+            self.assertEqual(tokens[-1].line, count)
+            return elapsed
+
+        small = tokenize_lines(10_000)
+        large = tokenize_lines(100_000)
+        # 10x input must stay well below the 100x of quadratic behaviour
+        self.assertLess(large, small * 30)
+
+    def test_stream(self):
+        with open('../example/without_mistakes.java') as f:
+            code = f.read()
+        code += "\nString[]\nargs System.out.println Math.max 0.23f 'я'\n"
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        expected = [(t.tag, t.value, t.pos, t.line, t.column) for t in lexer.tokens]
+
+        for chunk_size in (1, 7, 4096):
+            lexer = Lexer(Tag, LEXER_RULES)
+            tokens = lexer.tokenize_stream(io.StringIO(code), chunk_size)
+            self.assertEqual([(t.tag, t.value, t.pos, t.line, t.column) for t in tokens], expected)
+
+            lexer = Lexer(Tag, LEXER_RULES)
+            tokens = lexer.tokenize_stream(io.BytesIO(code.encode()), chunk_size)
+            self.assertEqual([(t.tag, t.value, t.pos, t.line, t.column) for t in tokens], expected)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'input.java')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(code)
+            lexer = Lexer(Tag, LEXER_RULES)
+            tokens = lexer.tokenize_file(path)
+            self.assertEqual([(t.tag, t.value, t.pos, t.line, t.column) for t in tokens], expected)
+
+    def test_stream_error(self):
+        lexer = Lexer(Tag, LEXER_RULES)
+        with self.assertRaises(LexerError) as error:
+            list(lexer.tokenize_stream(io.StringIO('int a;\n' * 100 + 'a = #;'), 16))
+        self.assertEqual(str(error.exception), "unexpected token '#' at line 101, column 5")
+
+    def test_token_buffer(self):
+        with open('../example/without_mistakes.java') as f:
+            code = f.read()
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        expected = [(t.tag, t.value, t.pos, t.line, t.column) for t in lexer.tokens]
+        self.assertEqual([column for *_, pos, line, column in expected],
+                         [pos - code.rfind('\n', 0, pos - 1) - 1 for *_, pos, line, column in expected])
+
+        for source in (code, code.encode()):
+            lexer = Lexer(Tag, LEXER_RULES)
+            lexer.buffer = source
+            token_buffer = lexer.tokenize_buffer()
+            self.assertEqual(len(token_buffer), len(expected))
+            self.assertEqual([(t.tag, t.value, t.pos, t.line, t.column) for t in token_buffer], expected)
+            self.assertEqual(token_buffer.tag_at(2), Tag.MAIN)
+            self.assertIs(token_buffer[1].value, token_buffer[1].value)
+
+        code = "char c = 'я';\nchar d = 'ё'; #"
+        for source in (code, code.encode()):
+            lexer = Lexer(Tag, LEXER_RULES)
+            lexer.buffer = source
+            with self.assertRaises(LexerError) as error:
+                lexer.tokenize_buffer()
+            self.assertEqual(str(error.exception), "unexpected token '#' at line 2, column 15")
+            lexer = Lexer(Tag, LEXER_RULES)
+            lexer.buffer = source[:-2]
+            token_buffer = lexer.tokenize_buffer()
+            self.assertEqual([(t.value, t.line, t.column) for t in token_buffer if t.tag == Tag.CHAR],
+                             [("'я'", 1, 10), ("'ё'", 2, 10)])
+            self.assertEqual(token_buffer[-1].pos, len(code) - 2)
+
+    def test_relex(self):
+        with open('../example/without_mistakes.java') as f:
+            code = f.read() * 3
+        snippets = ['', ' ', '\n', 'a', 'nt', 'int x = 1;\n', 'Math.', 'max', '++', '=', '.5f', '}\n{', "'c'"]
+        generator = random.Random(7)
+
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        tokens = list(lexer.tokens)
+        for _ in range(300):
+            start = generator.randrange(len(code) + 1)
+            end = min(len(code), start + generator.choice([0, 0, 1, 3, 10]))
+            text = generator.choice(snippets)
+            new_code = code[:start] + text + code[end:]
+
+            full = Lexer(Tag, LEXER_RULES)
+            full.buffer = new_code
+            try:
+                expected = [(t.tag, t.value, t.pos, t.line, t.column) for t in full.tokens]
+            except LexerError:
+                continue
+            tokens = lexer.relex(tokens, start, end, text)
+            self.assertEqual([(t.tag, t.value, t.pos, t.line, t.column) for t in tokens], expected)
+            self.assertEqual(lexer.buffer, new_code)
+            code = new_code
+
+    def test_parallel(self):
+        with open('../example/without_mistakes.java') as f:
+            code = (f.read() + "String[]\nargs 'x'\n") * 50
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        expected = [(t.tag, t.value, t.pos, t.line, t.column) for t in lexer.tokens]
+
+        for max_workers in (1, 2, 7):
+            lexer = Lexer(Tag, LEXER_RULES)
+            lexer.buffer = code
+            tokens = lexer.tokenize_parallel(max_workers, threshold=1000)
+            self.assertEqual([(t.tag, t.value, t.pos, t.line, t.column) for t in tokens], expected)
+
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code + 'int a = #;'
+        with self.assertRaises(LexerError) as error:
+            lexer.tokenize_parallel(2, threshold=1000)
+        self.assertEqual(str(error.exception), f"unexpected token '#' at line {code.count(chr(10)) + 1}, column 9")
+
+    def test_recover(self):
+        code = "int a = 1 # 2;\n\tа = a ^ 3;\nreturn a@;"
+        expected = [(1, 1, 11), (2, 2, 2), (1, 2, 8), (1, 3, 9)]
+        sources = [
+            lambda lexer: lexer.tokens,
+            lambda lexer: lexer.tokenize_stream(io.StringIO(code), 4),
+            lambda lexer: lexer.tokenize_buffer(),
+            lambda lexer: lexer.tokenize_parallel(2, threshold=0),
+        ]
+        for source in sources:
+            lexer = Lexer(Tag, LEXER_RULES, recover=True)
+            lexer.buffer = code
+            tokens = []
+            with self.assertRaises(UnexpectedTokensError) as error:
+                tokens.extend(source(lexer))
+            errors = error.exception.errors
+            self.assertEqual([(len(e.char.encode()), e.line, e.column) for e in errors], expected)
+            if tokens:
+                self.assertEqual([t.value for t in tokens], 'int a = 1 2 ; = a 3 ; return a ;'.split())
+
+        lexer = Lexer(Tag, LEXER_RULES, recover=True)
+        lexer.buffer = code.encode()
+        with self.assertRaises(UnexpectedTokensError) as error:
+            lexer.tokenize_buffer()
+        self.assertEqual([(e.char, e.line, e.column) for e in error.exception.errors][1], ('а', 2, 2))
+
+    def test_shared_tables(self):
+        self.assertIs(Lexer(Tag, LEXER_RULES).tables, Lexer(Tag, LEXER_RULES, recover=True).tables)
+        codes = [f'int a{i} = {i};\nif (a{i} > 1) {{ a{i} += 2; }}\n' * (i + 1) for i in range(8)]
+
+        def tokenize(code):
+            lexer = Lexer(Tag, LEXER_RULES)
+            lexer.buffer = code
+            return [(token.tag, token.value, token.line) for token in lexer.tokens]
+
+        expected = [tokenize(code) for code in codes]
+        results = [None] * len(codes)
+
+        def worker(i):
+            for _ in range(20):
+                results[i] = tokenize(codes[i])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(codes))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, expected)
+
+    def test_tracer(self):
+        code = 'int a = 1;\n  a += 2;\n'
+        seen = []
+
+        class Tracer(LexerTracer):
+            def on_token(self, token):
+                seen.append(token.value)
+
+        tracer = Tracer()
+        lexer = Lexer(Tag, LEXER_RULES, tracer=tracer)
+        lexer.buffer = code
+        tokens = list(lexer.tokens)
+        self.assertEqual(seen, [token.value for token in tokens])
+        self.assertEqual(tracer.tokens[Tag.ID], 2)
+        self.assertEqual(sum(tracer.tokens.values()), len(tokens))
+        self.assertEqual(tracer.chars, code.rindex(';') + 1)
+        self.assertGreater(tracer.seconds, 0)
+        self.assertIs(lexer.tracer, tracer)
+
 
 def tests():
     unittest.main()
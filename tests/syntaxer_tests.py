@@ -1,7 +1,18 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
+from transpiler.base import Token
 from transpiler.constants import Tag, LEXER_RULES
 from transpiler.lexer.lexer import Lexer
-from transpiler.syntaxer.earley import Grammar, EarleyParse, SyntaxAnalyzerError
+from transpiler.syntaxer.earley import Grammar, EarleyParse, SyntaxAnalyzerError, ChartEntry, EarleyState, Rule, \
+    CompiledGrammar
+from transpiler.semantixer.semantixer import SemanticAnalyzer
+from transpiler.syntaxer.backend import create_parser
+from transpiler.syntaxer.cst import SyntaxTree
+from transpiler.syntaxer.lalr import GrammarConflictError, LALRParse, LALRTables
+from transpiler.syntaxer.methods import MethodParse
 
 
 class SyntaxerExceptionsTestCase(unittest.TestCase):
@@ -399,6 +410,464 @@ class SyntaxerExceptionsTestCase(unittest.TestCase):
             }
         """)
 
+    def test_token_buffer(self):
+        with open('../example/without_mistakes.java') as f:
+            code = f.read()
+        self.init_test(code)
+        expected = EarleyParse(self.tokens, self.grammar).get_parse_tree()
+
+        for source in (code, code.encode()):
+            self.lexer = Lexer(Tag, LEXER_RULES)
+            self.lexer.buffer = source
+            tree = EarleyParse(self.lexer.tokenize_buffer(), self.grammar).get_parse_tree()
+            self.assertEqual(str(tree), str(expected))
+            self.assertTrue(SemanticAnalyzer().is_correct(tree))
+
+    def test_chart_entry(self):
+        rule = Rule('<assignment>', ['<id>', '<assign>', '<expression>'])
+        entry = ChartEntry([])
+        entry.add(EarleyState(rule, dot=1, sent_pos=3, chart_pos=5))
+        entry.add(EarleyState(Rule('<assignment>', ['<id>', '<assign>', '<expression>']), dot=1, sent_pos=3))
+        entry.add(EarleyState(rule, dot=3, sent_pos=3, chart_pos=5))
+        self.assertEqual(len(entry), 2)
+        self.assertEqual([state.dot_position for state in entry.waiting_for('<assign>')], [1])
+        self.assertEqual(list(entry.waiting_for('<expression>')), [])
+
+    def test_compiled_grammar(self):
+        grammar = Grammar.load_grammar('../example/grammar.txt')
+        compiled = grammar.compile(normalize=False)
+        self.assertEqual(str(compiled).split('\n'),
+                         [line for line in str(grammar).split('\n') if line != '<code_block> -> <code_block>'])
+        self.assertTrue(compiled.is_tag('<semicolon>'))
+        self.assertFalse(compiled.is_tag('<code_block>'))
+        self.assertTrue(compiled.is_terminal('semicolon'))
+        self.assertTrue(compiled.is_terminal('<unknown>'))
+        self.assertNotIn('<unknown>', compiled.ids)
+        self.assertFalse(any(compiled.nullable))
+        lhs, rhs = compiled.productions[0]
+        self.assertEqual(compiled.symbols[lhs], '<program>')
+        self.assertEqual([compiled.symbols[s] for s in rhs], list(grammar['<program>'][0].rhs))
+        with self.assertRaises(TypeError):
+            compiled.add(Rule('<id>', ['id']))
+
+        nullable = Grammar.parse('<a> -> <b> <c>\n<b> -> b | <c>\n<c> -> ').compile()
+        self.assertEqual([nullable.nullable[nullable.ids[s]] for s in ('<a>', '<b>', '<c>', 'b')],
+                         [True, True, True, False])
+
+    def test_normalization(self):
+        grammar = Grammar.load_grammar('../example/grammar.txt')
+        compiled = grammar.compile()
+        self.assertEqual([str(rule) for rule in compiled['<math_expression>']].count('<math_expression> -> <func_call>'), 1)
+        self.assertEqual([str(rule) for rule in compiled['<func_declaration>']],
+                         ['<func_declaration> -> <public> <static> <func_return_type> <id> <lbracket> <func_declaration~1>'])
+        self.assertEqual(len(compiled['<func_declaration~1>']), 2)
+        self.assertIn('<func_declaration~1>', compiled.hidden)
+        self.assertEqual(len(compiled['<code_block>']), 6)
+
+        cyclic = Grammar.parse('<a> -> <b> | x\n<b> -> <a> | <c> | y\n<c> -> z').compile()
+        self.assertEqual({str(rule) for rule in cyclic['<a>']}, {'<a> -> x', '<a> -> <c>', '<a> -> y'})
+        self.assertEqual({str(rule) for rule in cyclic['<b>']}, {'<b> -> x', '<b> -> <c>', '<b> -> y'})
+
+        with open('../example/semantixer_test.txt') as f:
+            self.init_test(f.read())
+        normalized = EarleyParse(self.tokens, compiled)
+        tree = normalized.get_parse_tree()
+        plain = EarleyParse(self.tokens, grammar.compile(normalize=False))
+        self.assertEqual(str(tree), str(plain.get_parse_tree()))
+        self.assertFalse(any('~' in subtree.label() for subtree in tree.subtrees()))
+        self.assertLess(sum(len(entry) for entry in normalized.chart), sum(len(entry) for entry in plain.chart))
+
+    def test_grammar_snapshot(self):
+        with open('../example/grammar.txt') as f:
+            source = f.read()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'grammar.txt')
+            with open(path, 'w') as f:
+                f.write(source)
+            cold = CompiledGrammar.load(path)
+            snapshots = os.listdir(os.path.join(directory, '__pycache__'))
+            self.assertEqual(len(snapshots), 1)
+            warm = CompiledGrammar.load(path)
+            self.assertEqual((warm.symbols, warm.productions, warm.preterminal),
+                             (cold.symbols, cold.productions, cold.preterminal))
+
+            with open(path, 'a') as f:
+                f.write('\n<extra> -> extra\n')
+            changed = CompiledGrammar.load(path)
+            self.assertTrue(changed.is_tag('<extra>'))
+            self.assertEqual(len(os.listdir(os.path.join(directory, '__pycache__'))), 2)
+
+        with open('../example/without_mistakes.java') as f:
+            self.init_test(f.read())
+        tree = EarleyParse(self.tokens, warm).get_parse_tree()
+        self.assertEqual(str(tree), str(EarleyParse(self.tokens, self.grammar).get_parse_tree()))
+
+    def test_parse_forest(self):
+        self.init_test("""
+            public class Main {
+                public static void main(String[] args) {
+                    a = 1 + 2 + 3;
+                }
+            }
+        """)
+        # without precedence the sum is ambiguous
+        self.grammar.precedence = []
+        earley = EarleyParse(self.tokens, self.grammar)
+        tree = earley.get_parse_tree()
+        self.assertEqual([token.value for token in tree.leaves()], [token.value for token in self.tokens])
+
+        sums = [
+            state for entry in earley.chart for state in entry
+            if state.is_complete() and state.rule.lhs == '<math_expression>'
+            and self.tokens[state.sentence_position].value == '1' and len(state) == 3
+        ]
+        self.assertTrue(any(state.alternatives for state in sums))
+        for state in sums:
+            self.assertIs(state.left.left.child, state.back_pointers[0])
+
+    def test_precedence(self):
+        def parse(expression):
+            self.init_test('public class Main { public static void main(String[] args) { b = %s; } }' % expression)
+            earley = EarleyParse(self.tokens, self.grammar)
+            tree = earley.get_parse_tree()
+            expression = tree[4, 8, 0, 0, 2, 0]
+            return expression, sum(len(entry) for entry in earley.chart)
+
+        def shape(tree):
+            if isinstance(tree, Token):
+                return tree.value
+            if len(tree) == 1:
+                return shape(tree[0])
+            return '(' + ' '.join(shape(subtree) for subtree in tree) + ')'
+
+        self.assertEqual(shape(parse('a + b * c - d')[0]), '((a + (b * c)) - d)')
+        self.assertEqual(shape(parse('a - b - c')[0]), '((a - b) - c)')
+        self.assertEqual(shape(parse('!a && b || c && !d')[0]), '(((! a) && b) || (c && (! d)))')
+        self.assertEqual(shape(parse('a + 1 < b * 2 && c')[0]), '(((a + 1) < (b * 2)) && c)')
+
+        operators = ['+', '*', '-', '/', '%']
+        small, large = (parse(' '.join(f'a {operators[i % 5]}' for i in range(n)) + ' a')[1] for n in (40, 160))
+        self.assertLess(large, small * 4.5)
+
+        grammar = Grammar.parse('%left +\n%right *\n<e> -> <e> <x> <e> | <e> <e>')
+        self.assertEqual(grammar.precedence, [('left', ('+',)), ('right', ('*',))])
+        self.assertEqual(str(grammar.compile()).split('\n'), str(grammar).split('\n'))
+        self.assertEqual(grammar.compile().levels['*'], (1, 'right'))
+        with self.assertRaises(ValueError):
+            Grammar.parse('%precedence +')
+
+    def test_leo_right_recursion(self):
+        def parse(statements):
+            arguments = ', '.join(str(i) for i in range(statements))
+            self.init_test(
+                'public class Main { public static void main(String[] args) {'
+                + f'print({arguments});' + ' a += 1;' * statements + '} }'
+            )
+            earley = EarleyParse(self.tokens, self.grammar)
+            tree = earley.get_parse_tree()
+            self.assertEqual([token.value for token in tree.leaves()], [token.value for token in self.tokens])
+            blocks = sum(1 for subtree in tree.subtrees() if subtree.label() == '<code_block>')
+            self.assertEqual(blocks, statements + 1)
+            return sum(len(entry) for entry in earley.chart)
+
+        small, large = parse(100), parse(400)
+        self.assertLess(large, small * 4.5)
+
+    def test_deep_tree(self):
+        statements = 100000
+        grammar = Grammar.parse('<program> -> <id_name> <program> | <id_name>\n<id_name> -> id')
+        self.lexer = Lexer(Tag, LEXER_RULES)
+        self.lexer.buffer = 'a ' * statements
+        tokens = list(self.lexer.tokens)
+
+        tree = EarleyParse(tokens, grammar).get_parse_tree()
+        depth = 0
+        while len(tree) == 2:
+            self.assertEqual(tree[0, 0].value, 'a')
+            tree = tree[1]
+            depth += 1
+        self.assertEqual(depth, statements - 1)
+
+    def test_lookahead(self):
+        compiled = Grammar.load_grammar('../example/grammar.txt').compile()
+        first = compiled.first[compiled.ids['<instruction>']]
+        self.assertTrue({'id', 'type_hint', 'if', 'while', 'for', 'do', 'return', 'semicolon'} <= first)
+        self.assertNotIn('lbracket_curly', first)
+        rule = compiled['<assignment>'][0]
+        self.assertEqual(rule.lookahead[1], {'assign'})
+        self.assertIsNone(rule.lookahead[3])
+
+        with open('../example/semantixer_test.txt') as f:
+            self.init_test(f.read())
+        earley = EarleyParse(self.tokens, self.grammar)
+        self.assertTrue(earley.get_parse_tree())
+        for i, entry in enumerate(earley.chart[:-1]):
+            tag = str(self.tokens[i].tag)
+            for state in entry:
+                if not state.is_complete() and state.rule.lookahead is not None:
+                    self.assertIn(tag, state.rule.lookahead[state.dot_position])
+
+    def test_preterminal_table(self):
+        compiled = Grammar.load_grammar('../example/grammar.txt').compile()
+        self.assertIs(compiled.scans['semicolon']['<semicolon>'], compiled['<semicolon>'][0])
+        self.assertEqual(set(compiled.scans['id']), {'<id_name>'})
+        self.assertNotIn('<id>', compiled.scans['main'])
+
+        with open('../example/without_mistakes.java') as f:
+            self.init_test(f.read())
+        earley = EarleyParse(self.tokens, compiled)
+        self.assertTrue(earley.get_parse_tree())
+        scanned = [state for entry in earley.chart for state in entry if compiled.is_tag(state.rule.lhs)]
+        self.assertEqual(len(scanned), len(self.tokens))
+        for state in scanned:
+            self.assertIs(state.rule, compiled.scans[state.rule.rhs[0]][state.rule.lhs])
+
+    def test_reparse(self):
+        lines = [f'int a{i} = {i} + 2 * (a - 1);' for i in range(50)]
+        program = 'public class Main { public static void main(String[] args) {\n%s\n} }'
+        self.init_test(program % '\n'.join(lines))
+        tokens = self.tokens
+
+        for old, new, reused in (('a40', 'b40', True), ('+', '*', False), ('int', 'a += 1; int', False)):
+            earley = EarleyParse(tokens, self.grammar)
+            earley.get_parse_tree()
+            chart = earley.chart.entries
+            self.init_test(program % '\n'.join(lines[:40] + [lines[40].replace(old, new, 1)] + lines[41:]))
+            tree = earley.reparse(self.tokens)
+            self.assertEqual(str(tree), str(EarleyParse(self.tokens, self.grammar).get_parse_tree()))
+            first = next(i for i, token in enumerate(self.tokens) if token.line > 1 + 40)
+            self.assertTrue(all(a is b for a, b in zip(chart[:first], earley.chart.entries)))
+            self.assertEqual(earley.chart.entries is chart, reused)
+
+    def test_reparse_after_error(self):
+        program = 'public class Main { public static void main(String[] args) {\nint x = 1;\n%s\nint y = 3;\n} }'
+        for edited in (program.replace('x', 'z'), program.replace('int y = 3', 'y = 3 + 1')):
+            self.init_test(program % 'x += 1;')
+            earley = EarleyParse(self.tokens, self.grammar)
+            self.assertIsNotNone(earley.get_parse_tree())
+            self.init_test(program % 'x += ;')
+            with self.assertRaises(SyntaxAnalyzerError):
+                earley.reparse(self.tokens)
+
+            self.init_test(edited % 'x += ;')
+            with self.assertRaises(SyntaxAnalyzerError) as error:
+                earley.reparse(self.tokens)
+            with self.assertRaises(SyntaxAnalyzerError) as expected:
+                EarleyParse(self.tokens, self.grammar).get_parse_tree()
+            self.assertEqual(str(error.exception), str(expected.exception))
+            self.assertEqual((error.exception.line, error.exception.column, error.exception.index), (3, 6, 19))
+
+            self.init_test(edited % 'x += 2;')
+            self.assertEqual(str(earley.reparse(self.tokens)), str(EarleyParse(self.tokens, self.grammar).get_parse_tree()))
+
+    def test_recognize(self):
+        def parses(tokens, grammar):
+            try:
+                return EarleyParse(tokens, grammar).get_parse_tree() is not None
+            except SyntaxAnalyzerError:
+                return False
+
+        with open('../example/semantixer_test.txt') as f:
+            code = f.read()
+        for text in (code, code.replace(';', '', 1), code[:len(code) // 2]):
+            self.init_test(text)
+            parsed = parses(self.tokens, self.grammar)
+            recognizer = EarleyParse(self.tokens, self.grammar)
+            self.assertEqual(recognizer.recognize(), parsed)
+            if parsed:
+                self.assertEqual(sum(entry is not None for entry in recognizer.chart.entries), 1)
+                self.assertTrue(all(state.child is None for state in recognizer.chart[-1]))
+                expected = str(EarleyParse(self.tokens, self.grammar).get_parse_tree())
+                self.assertEqual(str(recognizer.get_parse_tree()), expected)
+                recognizer.recognize()
+                self.assertEqual(str(recognizer.reparse(self.tokens)), expected)
+
+        grammar = Grammar.parse('%nonassoc compare\n<program> -> <e>\n<e> -> <e> <compare> <e> | <id_name>\n'
+                                '<id_name> -> id\n<compare> -> compare')
+        for text, valid in (('a < b', True), ('a < b < c', False)):
+            self.lexer = Lexer(Tag, LEXER_RULES)
+            self.lexer.buffer = text
+            tokens = list(self.lexer.tokens)
+            self.assertEqual(parses(tokens, grammar), valid)
+            self.assertEqual(EarleyParse(tokens, grammar).recognize(), valid)
+        with self.assertRaises(AttributeError):
+            EarleyState.init().label = None
+
+    def test_error_diagnostics(self):
+        statements = ' int a = 1 + 2;' * 1000
+        self.init_test('public class Main { public static void main(String[] args) {\n'
+                       'int x = 1;\nx += ;' + statements + '} }')
+        earley = EarleyParse(self.tokens, self.grammar)
+        with self.assertRaises(SyntaxAnalyzerError) as error:
+            earley.get_parse_tree()
+        error = error.exception
+        self.assertEqual((error.line, error.token.value, error.column, error.index), (3, ';', 6, 19))
+        self.assertIs(error.token, self.tokens[19])
+        self.assertTrue({'id', 'number_int', 'lbracket', 'boolean_not'} <= error.expected)
+        self.assertNotIn('semicolon', error.expected)
+        self.assertIn("unexpected ';' (semicolon) at column 6, expected ", str(error))
+        self.assertEqual(sum(len(entry) for entry in earley.chart[20:]), 0)
+
+        self.init_test('public class Main { public static void main(String[] args) { } } }')
+        with self.assertRaises(SyntaxAnalyzerError) as error:
+            EarleyParse(self.tokens, self.grammar).get_parse_tree()
+        self.assertEqual(error.exception.expected, set())
+        self.assertTrue(str(error.exception).endswith('expected end of input'))
+
+    def test_method_parse(self):
+        method = 'public static int f%d(int a, int b) { int c = a + b * 2; if (c > 1) { c -= 1; } return c; }\n'
+        main = 'public static void main(String[] args) { int x = f0(1, 2); { x += 1; } }\n'
+        program = 'public class Main {\n%s%s%s}'
+        for before, after in ((3, 2), (0, 1), (2, 0)):
+            self.init_test(program % (''.join(method % i for i in range(before)), main,
+                                      ''.join(method % i for i in range(after))))
+            tree = MethodParse(self.tokens, self.grammar, max_workers=2, threshold=0).get_parse_tree()
+            self.assertEqual(str(tree), str(EarleyParse(self.tokens, self.grammar).get_parse_tree()))
+        self.assertIsInstance(create_parser(self.tokens, self.grammar, 'parallel'), MethodParse)
+
+        self.init_test(program % (method % 0, main.replace('x += 1;', 'x += ;'), method % 1))
+        with self.assertRaises(SyntaxAnalyzerError) as error:
+            MethodParse(self.tokens, self.grammar, max_workers=2, threshold=0).get_parse_tree()
+        self.assertEqual(error.exception.line, 3)
+
+    def test_syntax_tree(self):
+        with open('../example/without_mistakes.java') as f:
+            self.init_test(f.read())
+        tree = EarleyParse(self.tokens, self.grammar).get_parse_tree()
+        expected = tree.to_nltk()
+
+        self.assertEqual(len(tree.tree), len(list(expected.subtrees())))
+        self.assertEqual([subtree.label() for subtree in tree.subtrees()],
+                         [subtree.label() for subtree in expected.subtrees()])
+        self.assertEqual([subtree.leaves() for subtree in tree.subtrees()],
+                         [subtree.leaves() for subtree in expected.subtrees()])
+        self.assertEqual(tree[4, 8].label(), expected[4, 8].label())
+        self.assertEqual(tree[-1, 0], expected[-1, 0])
+        self.assertEqual(len(tree), len(expected))
+        self.assertEqual(tree.leaves(), self.tokens)
+        self.assertEqual(str(SyntaxTree.from_nltk(expected).root), str(expected))
+
+        # the pipeline does not need nltk, only the adapter does
+        script = ('import sys\nfrom transpiler.generator import compiler\n'
+                  'from transpiler.syntaxer.cst import SyntaxTree\n'
+                  'print(sorted(module for module in sys.modules if module.split(".")[0] == "nltk"))')
+        result = subprocess.run([sys.executable, '-c', script], cwd='..', capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+class LALRTestCase(unittest.TestCase):
+    PRETERMINALS = '\n'.join(
+        f'<{tag}> -> {tag}' for tag in (
+            'public', 'class', 'main', 'static', 'void', 'string_args', 'lbracket', 'rbracket', 'lbracket_curly',
+            'rbracket_curly', 'id_name', 'assign', 'semicolon', 'while', 'math_operator', 'number_int',
+        )
+    ).replace('<id_name> -> id_name', '<id_name> -> id')
+    PROGRAM = """
+        <program> -> <public> <class> <main> <lbracket_curly> <main_func> <rbracket_curly>
+        <main_func> -> <public> <static> <void> <main> <lbracket> <string_args> <rbracket> <lbracket_curly> <code_block> <rbracket_curly>
+        <code_block> -> <instruction> <code_block> | <instruction>
+        <instruction> -> <id_name> <assign> <expression> <semicolon> | <while> <lbracket> <expression> <rbracket> <lbracket_curly> <code_block> <rbracket_curly>
+    """
+    CODE = """
+        public class Main {
+            public static void main(String[] args) {
+                a = 1 + b * (2 - c);
+                while (a) { a = a - 1; b = 2; }
+            }
+        }
+    """
+
+    def tokenize(self, code):
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        return list(lexer.tokens)
+
+    def test_same_tree_as_earley(self):
+        grammar = Grammar.parse(self.PROGRAM + """
+            <expression> -> <expression> <math_operator> <term> | <term>
+            <term> -> <id_name> | <number_int> | <lbracket> <expression> <rbracket>
+        """ + self.PRETERMINALS).compile()
+        tokens = self.tokenize(self.CODE)
+        parser = create_parser(tokens, grammar)
+        self.assertIsInstance(parser, LALRParse)
+        self.assertEqual(str(parser.get_parse_tree()), str(EarleyParse(tokens, grammar).get_parse_tree()))
+        self.assertIsNone(LALRParse(tokens[:-1], grammar).get_parse_tree())
+
+        tokens = self.tokenize(self.CODE.replace('b = 2;', 'b = 2 2;'))
+        for parser in (LALRParse(tokens, grammar), EarleyParse(tokens, grammar)):
+            with self.assertRaises(SyntaxAnalyzerError) as error:
+                parser.get_parse_tree()
+            self.assertEqual(error.exception.line, 5)
+            self.assertIs(error.exception.token, tokens[error.exception.index])
+            self.assertEqual(error.exception.token.value, '2')
+            self.assertIn('semicolon', error.exception.expected)
+
+    def test_feed(self):
+        grammar = Grammar.parse(self.PROGRAM + """
+            <expression> -> <expression> <math_operator> <term> | <term>
+            <term> -> <id_name> | <number_int> | <lbracket> <expression> <rbracket>
+        """ + self.PRETERMINALS).compile()
+        tokens = self.tokenize(self.CODE)
+        tree = str(EarleyParse(tokens, grammar).get_parse_tree())
+        for parser in (LALRParse, EarleyParse):
+            online = parser([], grammar)
+            for token in tokens:
+                online.feed(token)
+            self.assertEqual(str(online.finish()), tree)
+            self.assertEqual(online.words, tokens)
+
+            online = parser([], grammar)
+            for token in tokens[:-1]:
+                online.feed(token)
+            self.assertIsNone(online.finish())
+
+            online = parser([], grammar)
+            wrong = self.tokenize(self.CODE.replace('b = 2;', 'b = 2 2;'))
+            with self.assertRaises(SyntaxAnalyzerError) as error:
+                for token in wrong:
+                    online.feed(token)
+            self.assertEqual(error.exception.token.value, '2')
+            self.assertIs(online.words[-1], error.exception.token)
+
+    def test_normalized_tree(self):
+        grammar = Grammar.parse(self.PROGRAM + """
+            <instruction> -> <while> <lbracket> <expression> <rbracket> <semicolon>
+            <expression> -> <expression> <math_operator> <term> | <term>
+            <term> -> <id_name> | <number_int> | <lbracket> <expression> <rbracket>
+        """ + self.PRETERMINALS)
+        compiled = grammar.compile()
+        self.assertTrue(compiled.hidden)
+        tokens = self.tokenize(self.CODE.replace('b = 2; }', 'b = 2; } while (b);'))
+        tree = LALRParse(tokens, compiled).get_parse_tree()
+        self.assertEqual(str(tree), str(EarleyParse(tokens, compiled).get_parse_tree()))
+        self.assertEqual(str(tree), str(EarleyParse(tokens, grammar.compile(normalize=False)).get_parse_tree()))
+
+    def test_precedence(self):
+        grammar = Grammar.parse(self.PROGRAM + """
+            <expression> -> <expression> <math_operator> <expression> | <id_name> | <number_int>
+        """ + self.PRETERMINALS).compile()
+        with self.assertRaises(GrammarConflictError):
+            LALRTables(grammar)
+
+        tables = LALRTables(grammar, [('left', ['math_operator'])])
+        tokens = self.tokenize(self.CODE.replace('b * (2 - c)', '2 - 3'))
+        tree = LALRParse(tokens, grammar, tables).get_parse_tree()
+        expression = next(tree.subtrees(lambda subtree: subtree.label() == '<expression>'))
+        self.assertEqual([token.value for token in expression[0].leaves()], ['1', '+', '2'])
+
+        declared = Grammar.parse('%left math_operator\n' + str(grammar)).compile()
+        parser = create_parser(tokens, declared)
+        self.assertIsInstance(parser, LALRParse)
+        self.assertEqual(str(parser.get_parse_tree()), str(tree))
+
+    def test_fallback(self):
+        grammar = Grammar.load_grammar('../example/grammar.txt').compile()
+        with open('../example/without_mistakes.java') as f:
+            tokens = self.tokenize(f.read())
+        self.assertIsInstance(create_parser(tokens, grammar), EarleyParse)
+        with self.assertRaises(GrammarConflictError):
+            create_parser(tokens, grammar, 'lalr')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,5 @@
+import sys
+from array import array
 from enum import Enum
 
 
@@ -34,14 +36,61 @@ class Token:
         value: str,
         pos: int | None = None,
         line: int | None = None,
+        column: int | None = None,
     ):
         self.tag = tag
         self.value = value
         self.pos = pos
         self.line = line
+        self.column = column
 
     def __str__(self):
         return str(self.value)
 
     def __repr__(self):
         return str(self.value) + ' ' + str(self.tag)
+
+
+class TokenBuffer:
+    """
+    Token sequence stored column-wise: tag ids, source offsets, lines and columns live in int arrays.
+    Values are sliced from the source on access and Token objects are built only on demand.
+    """
+
+    def __init__(self, source: str, tags: list[Symbol]):
+        self.source = source
+        self.tags = tags
+        self.tag_ids = array('i')
+        self.starts = array('i')
+        self.ends = array('i')
+        self.lines = array('i')
+        self.columns = array('i')
+
+    def append(self, tag_id: int, start: int, end: int, line: int, column: int):
+        self.tag_ids.append(tag_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def tag_at(self, i: int) -> Symbol:
+        return self.tags[self.tag_ids[i]]
+
+    def value_at(self, i: int) -> str:
+        return sys.intern(self.source[self.starts[i]:self.ends[i]])
+
+    def __len__(self):
+        return len(self.tag_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('token index out of range')
+        return Token(self.tag_at(i), self.value_at(i), self.starts[i] + 1, self.lines[i], self.columns[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -5,6 +5,24 @@ import re
 
 WHITESPACE = re.compile('\S')
 LEXER_REGEX_FLAGS = re.IGNORECASE
+STREAM_CHUNK_SIZE = 1 << 16
+# chars that must follow a match before a streamed token is final,
+# longer than any fixed token such as 'System.out.println'
+STREAM_LOOKAHEAD = 64
+# sources shorter than this are not worth a process pool
+PARALLEL_THRESHOLD = 1 << 20
+LOG_FORMAT = '%(levelname)s:[%(module)s:%(lineno)d]: %(message)s'
+# bumped whenever the snapshot layout of a compiled grammar changes
+GRAMMAR_SNAPSHOT_VERSION = 5
+# snapshots are kept next to the grammar file, like python bytecode
+GRAMMAR_SNAPSHOT_DIR = '__pycache__'
+# 'auto' uses the LALR(1) parser when the grammar allows it and Earley otherwise,
+# 'parallel' parses every top-level method with Earley in a process pool
+PARSER_BACKENDS = ('auto', 'lalr', 'earley', 'parallel')
+# programs with fewer tokens than this are parsed whole, a process pool costs more than it saves
+PARALLEL_PARSE_THRESHOLD = 1 << 14
+# grammar lines like `%left + -` declare operator precedence, one level per line from the lowest
+ASSOCIATIVITY = ('left', 'right', 'nonassoc')
 
 
 class Special(Symbol):
@@ -1,7 +1,8 @@
 from transpiler.constants import Tag, LEXER_RULES
 from transpiler.lexer.lexer import Lexer
 from transpiler.semantixer.semantixer import SemanticAnalyzer
-from transpiler.syntaxer.earley import Grammar, EarleyParse
+from transpiler.syntaxer.backend import create_parser
+from transpiler.syntaxer.earley import CompiledGrammar, SyntaxAnalyzerError
 from transpiler.generator.generator import Generator
 
 import os
@@ -9,16 +10,23 @@ import os
 
 def compiler(app):
     filepath = os.path.join(app.config["UPLOAD_FOLDER"], 'grammar.txt')
-    grammar = Grammar.load_grammar(filepath)
+    grammar = CompiledGrammar.load(filepath)
 
-    with open(os.path.join(app.config["UPLOAD_FOLDER"], 'text.txt')) as f:
-        document = f.read()
-    lexer = Lexer(Tag, LEXER_RULES, filepath)
-    lexer.buffer = document
-    tokens = list(lexer.tokens)
-
-    earley = EarleyParse(tokens, grammar)
-    parse = earley.get_parse_tree()
+    lexer = Lexer(Tag, LEXER_RULES, filepath, recover=True)
+    parser = create_parser([], grammar, app.config.get('PARSER', 'auto'))
+    # tokens are parsed as they are lexed, a syntax error stops the lexer
+    tokens = lexer.tokenize_file(os.path.join(app.config["UPLOAD_FOLDER"], 'text.txt'))
+    try:
+        for token in tokens:
+            parser.feed(token)
+    except SyntaxAnalyzerError:
+        if not lexer.errors:
+            raise
+        # a skipped char can be what broke the syntax, so the unexpected chars of the whole file come first
+        for _ in tokens:
+            pass
+        raise
+    parse = parser.finish()
 
     semantixer = SemanticAnalyzer()
     semantixer.is_correct(parse)
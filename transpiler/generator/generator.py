@@ -1,5 +1,4 @@
-import nltk
-from nltk.tree import Tree
+from transpiler.syntaxer.cst import Node
 
 
 class Generator:
@@ -46,7 +45,7 @@ class Generator:
             # all other tokens
         return formatized_token
 
-    def __get_func_return_type(self, func_tree: nltk.Tree):
+    def __get_func_return_type(self, func_tree: Node):
         for subtree in func_tree.subtrees():
             if subtree.label() == '<func_return_type>':
                 type = str(subtree.leaves()[0])
@@ -55,12 +54,12 @@ class Generator:
                 else:
                     return str(subtree.leaves()[0])
 
-    def __get_func_id(self, func_tree: nltk.Tree):
+    def __get_func_id(self, func_tree: Node):
         for subtree in func_tree.subtrees():
             if subtree.label() == '<id>':
                 return str(subtree.leaves()[0])
 
-    def __get_func_params(self, func_tree: nltk.Tree):
+    def __get_func_params(self, func_tree: Node):
         params_string = ''
         i = 0
         for subtree in func_tree.subtrees():
@@ -73,26 +72,26 @@ class Generator:
             i = i + 1
         return params_string
 
-    def __get_func_code(self, func_tree: nltk.Tree):
+    def __get_func_code(self, func_tree: Node):
         func_name = ''
         bracket_stack = []
         tab_stack = ['']
         func_code_string = '    '
         for subtree in func_tree.subtrees():
             if subtree.label() == '<code_block>':
-                leaves = subtree.leaves()
-                for i in range(len(leaves)):
-                    leaf = leaves[i]
+                tokens = subtree.leaves()
+                for i in range(len(tokens)):
+                    leaf = tokens[i]
                     leaf_value = str(leaf)
                     # if token is '{' then add tab
                     if leaf_value == '{':
                         tab_stack.append('')
                     # if next token is '}' pop tab
-                    elif i + 1 < len(leaves) and str(leaves[i+1]) == '}':
+                    elif i + 1 < len(tokens) and str(tokens[i+1]) == '}':
                         if len(tab_stack) > 0:
                             tab_stack.pop()
                     # if token is last pop tab (stack will be empty)
-                    elif i + 1 == len(leaves):
+                    elif i + 1 == len(tokens):
                         tab_stack.pop()
                     match func_name:
                         # if token in println
@@ -142,14 +141,14 @@ class Generator:
                             func_code_string += self._formatize_token(leaf_value, len(tab_stack))
                 return func_code_string
 
-    def __generate_main(self, main_tree: nltk.Tree):
+    def __generate_main(self, main_tree: Node):
         func_string = 'void main(int argc, char *argv[])\n'
         func_string += '{\n'
         func_string += self.__get_func_code(main_tree)
         func_string += '}\n'
         return func_string
 
-    def __generate_function(self, func_tree: nltk.Tree):
+    def __generate_function(self, func_tree: Node):
         func_string = ''
         func_string += self.__get_func_return_type(func_tree) + ' '
         func_string += self.__get_func_id(func_tree)
@@ -159,7 +158,7 @@ class Generator:
         func_string += '}\n'
         return func_string
 
-    def generate_code(self, tree: nltk.Tree):
+    def generate_code(self, tree: Node):
         self.code += '#include <iostream>\n\n'
         subtree_main = None
         for subtree in tree:
@@ -1,17 +1,16 @@
+import codecs
+import mmap
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
 import re
-from sty import fg
-import logging
 import os
+from time import perf_counter
 
-from transpiler.constants import WHITESPACE, LEXER_REGEX_FLAGS, Special
-from transpiler.base import Token, Terminal
-
-logging.basicConfig(
-    format='%(levelname)s:[%(module)s:%(lineno)d]: %(message)s',
-    level=os.getenv('LOG_LEVEL', logging.WARNING),
-)
-
-logger = logging.getLogger(__name__)
+from transpiler.constants import WHITESPACE, LEXER_REGEX_FLAGS, Special, STREAM_CHUNK_SIZE, STREAM_LOOKAHEAD, \
+    PARALLEL_THRESHOLD
+from transpiler.base import Token, TokenBuffer, Terminal
+from transpiler.lexer.tables import get_tables
+from transpiler.lexer.tracer import LexerTracer
 
 
 class TranspilerError(Exception):
@@ -23,12 +22,37 @@ class LexerError(TranspilerError):
 
 
 class UnexpectedTokenError(LexerError):
-    pass
+    def __init__(self, char: str, line: int, column: int):
+        super().__init__(char, line, column)
+        self.char = char
+        self.line = line
+        self.column = column
+
+    def __str__(self):
+        return f"unexpected token '{self.char}' at line {self.line}, column {self.column}"
+
+
+class UnexpectedTokensError(LexerError):
+    """
+    Every unexpected token of a source, collected by a lexer in recovery mode.
+    """
+
+    def __init__(self, errors: list[UnexpectedTokenError]):
+        super().__init__(errors)
+        self.errors = errors
+
+    def __str__(self):
+        return '\n'.join(str(error) for error in self.errors)
 
 
 class Lexer:
     """
     Token parser from code sequence.
+
+    With `recover` set, an unexpected char is recorded and skipped instead of stopping the lexer;
+    every tokenize method then raises one UnexpectedTokensError for the whole source at the end.
+
+    A `tracer` sees every parsed token; without one the lexer pays a single None check per token.
     """
 
     def __init__(
@@ -36,16 +60,33 @@ class Lexer:
         terminal_cls: type[Terminal],
         rules: list,
         filepath: str | None = None,
+        recover: bool = False,
+        tracer: LexerTracer | None = None,
     ):
         self.terminal_cls = terminal_cls
-        parts = [f'(?P<{rule.tag.value}>{rule.regex})' for rule in rules]
-        self.regex = re.compile('|'.join(parts))
+        self.rules = rules
+        self.tables = get_tables(rules)
+        self.tags = self.tables.tags
+        self.regex = self.tables.regex
+        self.keywords = self.tables.keywords
+        self.group_tag_ids = self.tables.group_tag_ids
+        self.group_keywords = self.tables.group_keywords
         self.pos: int = 0
+        # line number at buffer offset `line_pos` and source offset where that line starts, advanced lazily
         self.line: int = 1
-        self.line_pos: int = 1
+        self.line_pos: int = 0
+        self.line_start: int = 0
 
-        self.buffer: str | None = None
+        self.buffer: str | bytes | None = None
         self.buffer_length: int = -1
+        # source offset of buffer[0] and whether the buffer holds the whole rest of the source
+        self.offset: int = 0
+        self.eof: bool = True
+
+        self.recover = recover
+        self.errors: list[UnexpectedTokenError] = []
+
+        self.tracer = tracer
 
         self.filepath = filepath
 
@@ -53,39 +94,299 @@ class Lexer:
     def tokens(self):
         assert self.buffer is not None, 'nothing to tokenize'
         self.buffer_length = len(self.buffer)
+        self._decode_buffer()
+        self.errors = []
 
         while token := self._parse_token():
             yield token
-        return
+        self._raise_errors()
 
-    def _parse_token(self) -> Token | None:
-        if self.pos > self.buffer_length:
-            return None
+    def tokenize_buffer(self) -> TokenBuffer:
+        """
+        Tokenize the whole buffer (str or utf-8 bytes) into a TokenBuffer instead of Token objects.
+        """
+        assert self.buffer is not None, 'nothing to tokenize'
+        self.buffer_length = len(self.buffer)
+        self._decode_buffer()
+        self.errors = []
+
+        token_buffer = TokenBuffer(self.buffer, self.tags)
+        while cursor := self._match_token():
+            line = self._get_line()
+            token_buffer.append(self._get_tag_id(cursor), self.pos, cursor.end(), line, self._get_column())
+            self.pos = cursor.end()
+        self._raise_errors()
+        return token_buffer
+
+    def tokenize_file(self, path: str):
+        """
+        Tokenize a file through a read-only memory map without reading it into one string.
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from self.tokenize_stream(mapped)
+
+    def tokenize_stream(self, fp, chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        Tokenize a text or binary (utf-8) stream read in chunks of `chunk_size`.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer, self.buffer_length = '', 0
+        self.pos = self.offset = self.line_pos = self.line_start = 0
+        self.line = 1
+        self.eof = False
+        self._decode_buffer()
+        self.errors = []
+
+        while not self.eof:
+            chunk = fp.read(chunk_size)
+            self.eof = not chunk
+            if isinstance(chunk, bytes):
+                chunk = decoder.decode(chunk, final=self.eof)
+            self._drop_parsed()
+            self.buffer += chunk
+            self.buffer_length = len(self.buffer)
+
+            while token := self._parse_token():
+                yield token
+        self._raise_errors()
+
+    def tokenize_parallel(self, max_workers: int | None = None, threshold: int = PARALLEL_THRESHOLD) -> list[Token]:
+        """
+        Tokenize the buffer in a process pool, one chunk of whole lines per worker.
+
+        Chunks are cut only at newlines that no token can span, so the merged result is the same
+        as list(self.tokens). Buffers shorter than `threshold` and traced lexers are tokenized serially.
+        """
+        assert self.buffer is not None, 'nothing to tokenize'
+        self._decode_buffer()
+        max_workers = max_workers or os.cpu_count() or 1
+        if len(self.buffer) < threshold or max_workers < 2 or self.tracer is not None:
+            return list(self.tokens)
+
+        bounds = [0]
+        chunk_size = max(len(self.buffer) // max_workers, 1)
+        for target in range(chunk_size, len(self.buffer), chunk_size):
+            split = self._find_split(max(target, bounds[-1]))
+            if split is None:
+                break
+            bounds.append(split)
+        bounds.append(len(self.buffer))
+
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = []
+            line = 1
+            for begin, end in zip(bounds, bounds[1:]):
+                # one char before the chunk keeps \b at its first token correct
+                context = min(begin, 1)
+                chunk = self.buffer[begin - context:end]
+                futures.append(executor.submit(
+                    _tokenize_chunk, self.terminal_cls, self.rules, self.recover, chunk, context, begin - context, line,
+                ))
+                line += chunk.count('\n', context)
+            tokens = []
+            self.errors = []
+            for future in futures:
+                chunk_tokens, chunk_errors = future.result()
+                tokens.extend(chunk_tokens)
+                self.errors.extend(chunk_errors)
+        self._raise_errors()
+        return tokens
+
+    def _find_split(self, pos: int) -> int | None:
+        """
+        Offset just past the first newline at or after `pos` that lies outside every token.
+        """
+        while (newline := self.buffer.find('\n', pos)) != -1:
+            # a token spanning the newline has to start within STREAM_LOOKAHEAD chars before it
+            for start in range(max(newline - STREAM_LOOKAHEAD, 0), newline + 1):
+                cursor = self.regex.match(self.buffer, start)
+                if cursor and cursor.end() > newline:
+                    break
+            else:
+                return newline + 1
+            pos = newline + 1
+        return None
+
+    def relex(self, previous_tokens: list[Token], edit_start: int, edit_end: int, new_text: str) -> list[Token]:
+        """
+        Update the tokens of the buffer after buffer[edit_start:edit_end] is replaced by new_text.
+
+        Lexing restarts after the last token that the edit cannot reach and stops as soon as a new
+        token lines up with an old one behind the edit. Old tokens from there on are reused:
+        their pos, line and column are shifted in place.
+        """
+        assert self.buffer is not None, 'nothing to tokenize'
+        old_text = self.buffer[edit_start:edit_end]
+        self.buffer = self.buffer[:edit_start] + new_text + self.buffer[edit_end:]
+        self.buffer_length = len(self.buffer)
+        self.offset = self.line_start = 0
+        self.eof = True
+        self._decode_buffer()
+        self.errors = []
+
+        def start_of(token):
+            return token.pos - 1
+
+        # tokens starting STREAM_LOOKAHEAD chars before the edit and ending before it stay as they are
+        kept = bisect_left(previous_tokens, edit_start - STREAM_LOOKAHEAD + 1, key=start_of)
+        while kept > 0 and start_of(previous_tokens[kept - 1]) + len(previous_tokens[kept - 1].value) >= edit_start:
+            kept -= 1
+        if kept > 0:
+            last = previous_tokens[kept - 1]
+            self.pos = start_of(last) + len(last.value)
+            self.line, self.line_pos = last.line, start_of(last)
+            self.line_start = start_of(last) - last.column + 1
+        else:
+            self.pos, self.line, self.line_pos = 0, 1, 0
+
+        shift = len(new_text) - (edit_end - edit_start)
+        line_shift = new_text.count('\n') - old_text.count('\n')
+        new_end = edit_start + len(new_text)
+        old_index = bisect_left(previous_tokens, edit_end, key=start_of)
+
+        tokens = previous_tokens[:kept]
+        while token := self._parse_token():
+            start = start_of(token)
+            if start >= new_end:
+                while old_index < len(previous_tokens) and start_of(previous_tokens[old_index]) + shift < start:
+                    old_index += 1
+                if old_index < len(previous_tokens):
+                    old = previous_tokens[old_index]
+                    if start_of(old) + shift == start and old.tag == token.tag and old.value == token.value:
+                        break
+            tokens.append(token)
+        else:
+            self._raise_errors()
+            return tokens
+        self._raise_errors()
 
-        cursor = WHITESPACE.search(self.buffer, self.pos)
+        rest = previous_tokens[old_index:]
+        # old tokens on the line of the first reused one move along it with that token
+        column_shift = token.column - rest[0].column
+        if column_shift:
+            for moved in rest:
+                if moved.line != rest[0].line:
+                    break
+                moved.column += column_shift
+        if shift or line_shift:
+            for token in rest:
+                token.pos += shift
+                token.line += line_shift
+        tokens.extend(rest)
+        return tokens
+
+    def _drop_parsed(self):
+        # keep one parsed char so that \b at the next token still sees its left neighbour
+        dropped = max(self.pos - 1, 0)
+        self._get_line()
+        self.buffer = self.buffer[dropped:]
+        self.pos -= dropped
+        self.line_pos -= dropped
+        self.offset += dropped
+
+    def _decode_buffer(self):
+        # utf-8 sources are matched as text, so that patterns see whole chars and positions count chars
+        if not isinstance(self.buffer, str):
+            self.buffer = str(self.buffer, 'utf-8')
+            self.buffer_length = len(self.buffer)
+
+    def _parse_token(self) -> Token | None:
+        if self.tracer is not None:
+            return self._trace_token()
+        cursor = self._match_token()
         if cursor is None:
             return None
 
-        self.pos = cursor.start()
-        cursor = self.regex.match(self.buffer, self.pos)
-        if cursor:
-            group = cursor.lastgroup
-            token = Token(
-                self.terminal_cls(group),
-                cursor.group(group),
-                self.pos + 1,
-                self._get_line()
-            )
-            logger.debug(
-                f'parsed token {fg.li_green}{token}{fg.rs} at line '
-                f'{token.line} ({group})'
-            )
-            self.pos = cursor.end()
-            return token
+        token = Token(
+            self.tags[self._get_tag_id(cursor)],
+            cursor.group(),
+            self.offset + self.pos + 1,
+            self._get_line(),
+            self._get_column()
+        )
+        self.pos = cursor.end()
+        return token
+
+    def _trace_token(self) -> Token | None:
+        tracer, self.tracer = self.tracer, None
+        pos = self.offset + self.pos
+        start = perf_counter()
+        try:
+            token = self._parse_token()
+        finally:
+            self.tracer = tracer
+        if token is not None:
+            tracer.add(token, self.offset + self.pos - pos, perf_counter() - start)
+        return token
+
+    def _get_tag_id(self, cursor: re.Match) -> int:
+        index = cursor.lastindex
+        keywords = self.group_keywords[index]
+        if keywords is not None:
+            return keywords.get(cursor.group(), self.group_tag_ids[index])
+        return self.group_tag_ids[index]
 
-        line = self._get_line()
-        msg = f"unexpected token '{self.buffer[self.pos]}' at line {line}"
-        raise UnexpectedTokenError(msg)
+    def _match_token(self) -> re.Match | None:
+        """
+        Skip whitespace up to the next token and match it without consuming.
+        """
+        while self.pos <= self.buffer_length:
+            cursor = WHITESPACE.search(self.buffer, self.pos)
+            if cursor is None:
+                self.pos = max(self.buffer_length, self.pos)
+                return None
+
+            self.pos = cursor.start()
+            cursor = self.regex.match(self.buffer, self.pos)
+            if not self.eof:
+                # a streamed token is final only once enough of the source follows it
+                end = cursor.end() if cursor else self.pos
+                if end + STREAM_LOOKAHEAD > self.buffer_length:
+                    return None
+            if cursor:
+                return cursor
+
+            error = UnexpectedTokenError(self.buffer[self.pos], self._get_line(), self._get_column())
+            if not self.recover:
+                raise error
+            self.errors.append(error)
+            self.pos += 1
+        return None
+
+    def _get_column(self):
+        # the line is advanced to pos first by _get_line
+        return self.offset + self.pos - self.line_start + 1
+
+    def _raise_errors(self):
+        if self.errors:
+            errors, self.errors = self.errors, []
+            raise UnexpectedTokensError(errors)
 
     def _get_line(self):
-        return self.buffer.count('\n', 0, self.pos) + 1
\ No newline at end of file
+        if self.pos < self.line_pos:
+            self.line, self.line_pos, self.line_start = 1, 0, 0
+        newline = self.buffer.rfind('\n', self.line_pos, self.pos)
+        if newline != -1:
+            self.line += self.buffer.count('\n', self.line_pos, newline + 1)
+            self.line_start = self.offset + newline + 1
+        self.line_pos = self.pos
+        return self.line
+
+
+def _tokenize_chunk(terminal_cls, rules, recover, chunk, start, offset, line):
+    lexer = Lexer(terminal_cls, rules, recover=recover)
+    lexer.buffer = chunk
+    lexer.pos = lexer.line_pos = start
+    lexer.offset = offset
+    # chunks start at a line
+    lexer.line_start = offset + start
+    lexer.line = line
+    tokens = []
+    try:
+        tokens.extend(lexer.tokens)
+    except UnexpectedTokensError as error:
+        return tokens, error.errors
+    return tokens, []
@@ -0,0 +1,56 @@
+import re
+import threading
+
+# a rule like \bif\b or \bint|boolean\b that matches whole words only
+KEYWORD_RULE = re.compile(r'\\b(\w+(?:\|\w+)*)\\b')
+
+_cache: dict[tuple, 'LexerTables'] = {}
+_cache_lock = threading.Lock()
+
+
+class LexerTables:
+    """
+    Compiled form of a rule set, shared read-only by every lexer built from the same rules.
+
+    Whole-word rules become keywords, looked up in a dict after a word is matched,
+    the other rules are joined into one alternation.
+    """
+
+    def __init__(self, rules: list):
+        self.tags = tuple(rule.tag for rule in rules)
+        self.keywords: dict[str, int] = {}
+        patterns = []
+        for tag_id, rule in enumerate(rules):
+            words = KEYWORD_RULE.fullmatch(rule.regex)
+            if words is None:
+                patterns.append((tag_id, rule))
+                continue
+            for word in words.group(1).split('|'):
+                self.keywords.setdefault(word, tag_id)
+
+        parts = [f'(?P<{rule.tag.value}>{rule.regex})' for _, rule in patterns]
+        self.regex = re.compile('|'.join(parts))
+
+        # tag id and keyword table for every value of `cursor.lastindex`
+        self.group_tag_ids: list[int | None] = [None] * (self.regex.groups + 1)
+        self.group_keywords: list[dict | None] = [None] * (self.regex.groups + 1)
+        for tag_id, rule in patterns:
+            self.group_tag_ids[self.regex.groupindex[rule.tag.value]] = tag_id
+        for word in self.keywords:
+            cursor = self.regex.fullmatch(word)
+            assert cursor is not None, f'keyword {word} is not matched by any pattern rule'
+            self.group_keywords[cursor.lastindex] = self.keywords
+
+
+def get_tables(rules: list) -> LexerTables:
+    """
+    Compiled tables of the rules, built once per process for every distinct rule set.
+    """
+    key = tuple((rule.tag, rule.regex) for rule in rules)
+    tables = _cache.get(key)
+    if tables is None:
+        with _cache_lock:
+            tables = _cache.get(key)
+            if tables is None:
+                tables = _cache[key] = LexerTables(rules)
+    return tables
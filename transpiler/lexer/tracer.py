@@ -0,0 +1,40 @@
+import logging
+from collections import Counter
+
+from sty import fg
+
+from transpiler.base import Token
+
+logger = logging.getLogger(__name__)
+
+
+class LexerTracer:
+    """
+    Counters of a lexer run: tokens per tag, chars scanned and seconds spent matching.
+
+    A lexer without a tracer does none of this work. Override `on_token` to watch every token.
+    """
+
+    def __init__(self):
+        self.tokens: Counter = Counter()
+        self.chars: int = 0
+        self.seconds: float = 0.0
+
+    def add(self, token: Token, chars: int, seconds: float):
+        self.tokens[token.tag] += 1
+        self.chars += chars
+        self.seconds += seconds
+        self.on_token(token)
+
+    def on_token(self, token: Token):
+        pass
+
+
+class LoggingTracer(LexerTracer):
+    """
+    Tracer that logs every parsed token at debug level.
+    """
+
+    def on_token(self, token: Token):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'parsed token {fg.li_green}{token}{fg.rs} at line {token.line} ({token.tag})')
@@ -1,16 +1,21 @@
-from transpiler.constants import Tag, LEXER_RULES
+import logging
+import os
+
+from transpiler.constants import Tag, LEXER_RULES, LOG_FORMAT
 from transpiler.lexer.lexer import Lexer
-from transpiler.syntaxer.earley import Grammar, EarleyParse
+from transpiler.lexer.tracer import LoggingTracer
+from transpiler.syntaxer.earley import CompiledGrammar, EarleyParse
 from transpiler.semantixer.semantixer import SemanticAnalyzer, get_tree
 
 
 def main():
+    logging.basicConfig(format=LOG_FORMAT, level=os.getenv('LOG_LEVEL', logging.WARNING))
     filepath = '../../example/grammar.txt'
-    grammar = Grammar.load_grammar(filepath)
+    grammar = CompiledGrammar.load(filepath)
 
     with open('../../example/semantixer_test.txt') as f:
         document = f.read()
-    lexer = Lexer(Tag, LEXER_RULES, filepath)
+    lexer = Lexer(Tag, LEXER_RULES, filepath, tracer=LoggingTracer())
     lexer.buffer = document
     tokens = list(lexer.tokens)
 
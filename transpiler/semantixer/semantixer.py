@@ -1,8 +1,8 @@
 from enum import Enum, IntEnum
-from nltk.tree import Tree
 
 from transpiler.base import Token
 from transpiler.constants import KEYWORDS, Label
+from transpiler.syntaxer.cst import Node
 
 
 class ErrorMessage(Enum):
@@ -83,7 +83,7 @@ class SemanticAnalyzer:
         self.func_list = []
         self.main_func = None
 
-    def is_correct(self, tree: Tree):
+    def is_correct(self, tree: Node):
         result = True
         self.__find_func(tree)
 
@@ -94,10 +94,15 @@ class SemanticAnalyzer:
         return result and func_analyzer.is_correct(self.main_func)
 
     def __find_func(self, tree):
-        for subtree in tree:
-            if subtree.label() == Label.FUNC_DECL:
+        # declarations nest one inside another, so they are walked with a stack instead of recursion
+        stack = [iter(tree)]
+        while stack:
+            subtree = next(stack[-1], None)
+            if subtree is None:
+                stack.pop()
+            elif subtree.label() == Label.FUNC_DECL:
                 self.__save_func(subtree)
-                self.__find_func(subtree)
+                stack.append(iter(subtree))
             elif subtree.label() == Label.MAIN_FUNC:
                 self.main_func = Function(subtree)
 
@@ -143,15 +148,19 @@ class Function:
 
     def __find_params(self, tree):
         params = []
-        for subtree in tree:
-            if subtree.label() == Label.FUNC_PARAMS:
-                param_id = subtree[1, 0, 0]
-                param_type = subtree[0, 0]
-                if not is_correct_name(param_id):
-                    raise SemanticError(param_id.line, ErrorMessage.id_keyword(param_id))
-                param = Variable(param_id, param_type, True)
-                params.append(param)
-                return params + self.__find_params(subtree)
+        while tree is not None:
+            for subtree in tree:
+                if subtree.label() == Label.FUNC_PARAMS:
+                    param_id = subtree[1, 0, 0]
+                    param_type = subtree[0, 0]
+                    if not is_correct_name(param_id):
+                        raise SemanticError(param_id.line, ErrorMessage.id_keyword(param_id))
+                    param = Variable(param_id, param_type, True)
+                    params.append(param)
+                    tree = subtree
+                    break
+            else:
+                tree = None
         return params
 
     def __find_code(self):
@@ -217,17 +226,20 @@ class FunctionAnalyzer:
                 raise SemanticError(func.tree[0, 0].line, ErrorMessage.return_not_exists(func.id))
         return result
 
-    def __find_token(self, tree: Tree):
-        for subtree in tree:
-            if type(subtree) == Token:
-                return subtree
-            else:
-                return self.__find_token(subtree)
-
-    def __is_correct_code(self, tree: Tree):
-        result = True
-        for subtree in tree:
-            if type(subtree) == Tree:
+    def __find_token(self, tree: Node):
+        while len(tree) > 0:
+            tree = tree[0]
+            if type(tree) == Token:
+                return tree
+
+    def __is_correct_code(self, tree: Node):
+        # pre-order walk with a stack of child iterators, code blocks nest as deep as the program is long
+        stack = [iter(tree)]
+        while stack:
+            subtree = next(stack[-1], None)
+            if subtree is None:
+                stack.pop()
+            elif type(subtree) == Node:
                 match subtree.label():
                     case Label.INSTRUCTION:
                         var_token = self.__find_token(subtree)
@@ -311,8 +323,8 @@ class FunctionAnalyzer:
                         self.returns_dict.pop(self.current_scope, None)
                         self.current_scope -= 1
 
-                result = result and self.__is_correct_code(subtree)
-        return result
+                stack.append(iter(subtree))
+        return True
 
     def __save_var(self, var_id, var_type, is_initialized=False):
         var = Variable(var_id, var_type)
@@ -381,11 +393,15 @@ class FunctionAnalyzer:
 
     def __get_func_call_params_expressions(self, tree):
         expressions = []
-        for subtree in tree:
-            if subtree.label() == Label.FUNC_CALL_PARAMS:
+        stack = [iter(tree)]
+        while stack:
+            subtree = next(stack[-1], None)
+            if subtree is None:
+                stack.pop()
+            elif subtree.label() == Label.FUNC_CALL_PARAMS:
                 expr = subtree[0, 0]
                 expressions.append(expr)
-                expressions += self.__get_func_call_params_expressions(subtree)
+                stack.append(iter(subtree))
         return expressions
 
     def __get_func_type(self, tree):
@@ -525,11 +541,17 @@ def is_correct_name(name):
     return True
 
 
-def get_tree(tree: Tree, margin=0):
-    result = ''
-    for subtree in tree:
-        if type(subtree) == Tree:
-            result += f'{"|  " * margin} {subtree.label()}\n{get_tree(subtree, margin + 1)}'
+def get_tree(tree: Node, margin=0):
+    result = []
+    stack = [(iter(tree), margin)]
+    while stack:
+        children, margin = stack[-1]
+        subtree = next(children, None)
+        if subtree is None:
+            stack.pop()
+        elif type(subtree) == Node:
+            result.append(f'{"|  " * margin} {subtree.label()}\n')
+            stack.append((iter(subtree), margin + 1))
         else:
-            result += f'{"|  " * margin} {subtree}\n'
-    return result
+            result.append(f'{"|  " * margin} {subtree}\n')
+    return ''.join(result)
@@ -1,23 +1,32 @@
-import sys
+import argparse
+import logging
+import os
 
-from transpiler.constants import Tag, LEXER_RULES
+from transpiler.constants import Tag, LEXER_RULES, LOG_FORMAT, PARSER_BACKENDS
 from transpiler.lexer.lexer import Lexer
-from transpiler.syntaxer.earley import Grammar, EarleyParse
+from transpiler.lexer.tracer import LoggingTracer
+from transpiler.syntaxer.backend import create_parser
+from transpiler.syntaxer.earley import CompiledGrammar
 
 
 def main():
-    filepath = sys.argv[1]
-    grammar = Grammar.load_grammar(filepath)
+    logging.basicConfig(format=LOG_FORMAT, level=os.getenv('LOG_LEVEL', logging.WARNING))
+    arguments = argparse.ArgumentParser(description='Parse example/text.txt with a grammar.')
+    arguments.add_argument('grammar')
+    arguments.add_argument('--parser', choices=PARSER_BACKENDS, default='auto')
+    options = arguments.parse_args()
+    filepath = options.grammar
+    grammar = CompiledGrammar.load(filepath)
 
     with open('../../example/text.txt') as f:
         document = f.read()
-    lexer = Lexer(Tag, LEXER_RULES, filepath)
+    lexer = Lexer(Tag, LEXER_RULES, filepath, tracer=LoggingTracer())
     lexer.buffer = document
     tokens = list(lexer.tokens)
     print(tokens)
 
-    earley = EarleyParse(tokens, grammar)
-    parse = earley.get_parse_tree()
+    parser = create_parser(tokens, grammar, options.parser)
+    parse = parser.get_parse_tree()
 
     if parse is None:
         print('Синтакс ерор :c \n')
@@ -0,0 +1,31 @@
+import logging
+
+from transpiler.constants import PARSER_BACKENDS
+from transpiler.syntaxer.earley import EarleyParse
+from transpiler.syntaxer.lalr import GrammarConflictError, LALRParse, get_tables
+from transpiler.syntaxer.methods import MethodParse
+
+logger = logging.getLogger(__name__)
+
+
+def create_parser(tokens, grammar, backend: str = 'auto'):
+    """
+    Parser of the tokens with the chosen backend, one of PARSER_BACKENDS.
+
+    'auto' falls back to Earley when the grammar is not LALR(1); 'lalr' raises GrammarConflictError then.
+    'parallel' parses the top-level methods of a large program with Earley in a process pool.
+    """
+    assert backend in PARSER_BACKENDS, f'unknown parser backend {backend}'
+    grammar = grammar.compile()
+    if backend == 'earley':
+        return EarleyParse(tokens, grammar)
+    if backend == 'parallel':
+        return MethodParse(tokens, grammar)
+    try:
+        tables = get_tables(grammar, grammar.precedence)
+    except GrammarConflictError as error:
+        if backend == 'lalr':
+            raise
+        logger.debug(f'falling back to Earley: {error}')
+        return EarleyParse(tokens, grammar)
+    return LALRParse(tokens, grammar, tables)
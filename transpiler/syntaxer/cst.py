@@ -0,0 +1,181 @@
+from array import array
+
+from transpiler.base import Token
+
+
+class SyntaxTree:
+    """
+    Concrete syntax tree stored column-wise, like a TokenBuffer.
+
+    Nodes are numbered in pre-order and live in int arrays: `kinds[n]` indexes `labels`, `ends[n]` is the
+    node after the last one of n's subtree, and the leaves of n are the tokens `firsts[n]` up to `lasts[n]`,
+    indices into `words`. Tokens that no child node spans are direct children of a node.
+    Nodes are read through Node cursors, built on access.
+    """
+
+    def __init__(self, words, labels=()):
+        self.words = words
+        self.labels = list(labels)
+        self.kind_ids = {label: i for i, label in enumerate(self.labels)}
+        self.kinds = array('H')
+        self.ends = array('i')
+        self.firsts = array('i')
+        self.lasts = array('i')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @property
+    def root(self):
+        return Node(self, 0)
+
+    def kind(self, label):
+        kind = self.kind_ids.get(label)
+        if kind is None:
+            kind = self.kind_ids[label] = len(self.labels)
+            self.labels.append(label)
+        return kind
+
+    def open(self, label, first, last=None):
+        """
+        Add a node whose leaves are tokens `first` up to `last`, the nodes added until it is closed
+        are its descendants. `last` may be left to `close`.
+        """
+        self.kinds.append(self.kind(label))
+        self.ends.append(-1)
+        self.firsts.append(first)
+        self.lasts.append(first if last is None else last)
+        return len(self.kinds) - 1
+
+    def close(self, node, last=None):
+        self.ends[node] = len(self.kinds)
+        if last is not None:
+            self.lasts[node] = last
+
+    def graft(self, tree, node, offset):
+        """
+        Copy the subtree of a node of another tree, its tokens moved by `offset`; returns the copied node.
+        """
+        kinds = [self.kind(label) for label in tree.labels]
+        start, end = node, tree.ends[node]
+        shift = len(self.kinds) - start
+        self.kinds.extend(kinds[kind] for kind in tree.kinds[start:end])
+        self.ends.extend(child_end + shift for child_end in tree.ends[start:end])
+        self.firsts.extend(first + offset for first in tree.firsts[start:end])
+        self.lasts.extend(last + offset for last in tree.lasts[start:end])
+        return start + shift
+
+    def to_nltk(self, node=0):
+        """
+        nltk.Tree of a subtree, for debugging and pretty printing.
+        """
+        from nltk.tree import Tree
+
+        trees = []
+        stack = [(Node(self, node), None)]
+        while stack:
+            subtree, start = stack.pop()
+            if start is not None:
+                children = trees[start:]
+                del trees[start:]
+                trees.append(Tree(subtree.label(), children))
+            elif isinstance(subtree, Node):
+                stack.append((subtree, len(trees)))
+                stack.extend((child, None) for child in reversed(list(subtree)))
+            else:
+                trees.append(subtree)
+        return trees[0]
+
+    @staticmethod
+    def from_nltk(tree):
+        """
+        Tree of an nltk.Tree, or anything with labels and children lists, over a new list of its leaves.
+        """
+        words = []
+        result = SyntaxTree(words)
+        stack = [tree]
+        while stack:
+            subtree = stack.pop()
+            if type(subtree) is int:
+                result.close(subtree, len(words))
+            elif isinstance(subtree, Token):
+                words.append(subtree)
+            else:
+                stack.append(result.open(subtree.label(), len(words)))
+                stack.extend(reversed(subtree))
+        return result
+
+
+class Node:
+    """
+    Cursor over a node of a SyntaxTree, read like an nltk.Tree: a label, children that are nodes
+    or tokens, tuple indices, `subtrees` and `leaves`, all without recursion.
+    """
+
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other):
+        return type(other) is Node and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def label(self):
+        return self.tree.labels[self.tree.kinds[self.index]]
+
+    def __iter__(self):
+        tree, words = self.tree, self.tree.words
+        token, child, end = tree.firsts[self.index], self.index + 1, tree.ends[self.index]
+        while child < end:
+            for i in range(token, tree.firsts[child]):
+                yield words[i]
+            yield Node(tree, child)
+            token, child = tree.lasts[child], tree.ends[child]
+        for i in range(token, tree.lasts[self.index]):
+            yield words[i]
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            node = self
+            for i in index:
+                node = node[i]
+            return node
+        if index < 0:
+            return list(self)[index]
+        for i, child in enumerate(self):
+            if i == index:
+                return child
+        raise IndexError('child index out of range')
+
+    def subtrees(self, filter=None):
+        """
+        The node and its descendant nodes in pre-order, those `filter` accepts when it is given.
+        """
+        tree = self.tree
+        for index in range(self.index, tree.ends[self.index]):
+            node = Node(tree, index)
+            if filter is None or filter(node):
+                yield node
+
+    def leaves(self):
+        tree = self.tree
+        return tree.words[tree.firsts[self.index]:tree.lasts[self.index]]
+
+    def to_nltk(self):
+        return self.tree.to_nltk(self.index)
+
+    def pretty_print(self, **kwargs):
+        self.to_nltk().pretty_print(**kwargs)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return str(self.to_nltk())
@@ -1,109 +1,63 @@
+import logging
 from collections import defaultdict
-from nltk.tree import Tree
+
+from transpiler.base import TokenBuffer
+from transpiler.syntaxer.cst import SyntaxTree
+from transpiler.syntaxer.grammar import Rule, Grammar, CompiledGrammar  # noqa: F401
+
+logger = logging.getLogger(__name__)
 
 
 class SyntaxAnalyzerError(Exception):
+    """
+    Syntax error at a line, with the unexpected token, its index in the token list
+    and the terminals that would have been accepted there when the parser knows them.
+    `column` is the column of the token in its line, as in lexer errors.
+    """
 
-    def __init__(self, line, message="syntax error at line "):
+    def __init__(self, line, message="syntax error at line ", token=None, index=None, expected=()):
         self.line = line
         self.message = message
+        self.token = token
+        self.index = index
+        self.column = token.column if token is not None else None
+        self.expected = frozenset(expected)
         super().__init__(self.message)
 
     def __str__(self):
-        return f'{self.message} {self.line}'
+        if self.token is None:
+            return f'{self.message} {self.line}'
+        expected = ', '.join(sorted(self.expected)) or 'end of input'
+        column = f' at column {self.column}' if self.column is not None else ''
+        return f"{self.message} {self.line}: unexpected '{self.token.value}' ({self.token.tag}){column}, " \
+               f"expected {expected}"
 
 
-class Rule:
-    """
-    lhs -> rhs
-    rhs = [...]
+class EarleyState:
     """
+    Earley item, also a node of the shared packed parse forest.
 
-    def __init__(self, lhs, rhs):
-        self.lhs, self.rhs = lhs, rhs
-
-    def __eq__(self, other):
-        if type(other) is Rule:
-            return self.lhs == other.lhs and self.rhs == other.rhs
-        return False
-
-    def __getitem__(self, i):
-        return self.rhs[i]
-
-    def __len__(self):
-        return len(self.rhs)
-
-    def __repr__(self):
-        return self.__str__()
-
-    def __str__(self):
-        return self.lhs + ' -> ' + ' '.join(self.rhs)
-
-
-class Grammar:
-
-    def __init__(self):
-        self.rules = defaultdict(list)
+    An advanced state links to the state it advanced from (`left`) and to the completed state
+    that moved the dot (`child`), so states share their derivation prefixes instead of copying them.
+    Other derivations of an equal state found later are packed into `alternatives`.
 
-    def add(self, rule):
-        self.rules[rule.lhs].append(rule)
-
-    @staticmethod
-    def load_grammar(fpath):
-        grammar = Grammar()
-        with open(fpath) as f:
-            for line in f:
-                line = line.strip()
-                if len(line) == 0:
-                    continue
-                entries = line.split('->')
-                lhs = entries[0].strip()
-                for rhs in entries[1].split(' | '):
-                    grammar.add(Rule(lhs, rhs.strip().split()))
-        return grammar
-
-    @staticmethod
-    def get_starting_non_terminal():
-        return '<program>'
-
-    def __repr__(self):
-        return self.__str__()
-
-    def __str__(self):
-        start = self.get_starting_non_terminal()
-        s = [str(r) for r in self.rules[start]]
-
-        for nt, rule_list in self.rules.items():
-            if nt == start:
-                continue
-            s += [str(r) for r in rule_list]
-        return '\n'.join(s)
-
-    # Returns the rules for a given Non-terminal.
-    def __getitem__(self, nt):
-        return self.rules[nt]
-
-    def is_terminal(self, symbol):
-        return len(self.rules[symbol]) == 0
-
-    def is_tag(self, symbol):
-        if not self.is_terminal(symbol):
-            return all(self.is_terminal(s) for r in self.rules[symbol] for s in r.rhs)
-        return False
-
-
-class EarleyState:
+    A state completed by Leo's optimization keeps the completed bottom state and the reduction path
+    above it in `reduction` instead of its child; the states in between are built on demand.
+    """
 
     START = '<START>'
+    __slots__ = ('rule', 'dot_position', 'sentence_position', 'chart_index', 'left', 'child', 'alternatives',
+                 'reduction')
 
-    def __init__(self, rule, dot=0, sent_pos=0, chart_pos=0, back_pointers=None):
-        if back_pointers is None:
-            back_pointers = []
+    def __init__(self, rule, dot=0, sent_pos=0, chart_pos=0, left=None, child=None):
         self.rule = rule
         self.dot_position = dot
         self.sentence_position = sent_pos
         self.chart_index = chart_pos
-        self.back_pointers = back_pointers
+        self.left = left
+        self.child = child
+        self.alternatives = None
+        self.reduction = None
 
     def __eq__(self, other):
         if type(other) is EarleyState:
@@ -111,6 +65,9 @@ class EarleyState:
                    self.sentence_position == other.sentence_position
         return False
 
+    def __hash__(self):
+        return hash((self.rule, self.dot_position, self.sentence_position))
+
     def __len__(self):
         return len(self.rule)
 
@@ -120,13 +77,45 @@ class EarleyState:
     def __str__(self):
         def str_helper(state):
             return ('(' + state.rule.lhs + ' -> ' +
-                    ' '.join(state.rule.rhs[:state.dot_position] + ['*'] +
+                    ' '.join(state.rule.rhs[:state.dot_position] + ('*',) +
                              state.rule.rhs[state.dot_position:]) +
                     (', [%d, %d])' % (state.sentence_position, state.chart_index)))
 
         return (str_helper(self) +
                 ' (' + ', '.join(str_helper(s) for s in self.back_pointers) + ')')
 
+    @property
+    def back_pointers(self):
+        """
+        Completed children of the first derivation, left to right.
+        """
+        if self.reduction is not None:
+            self.expand()
+        children = []
+        state = self
+        while state.child is not None:
+            children.append(state.child)
+            state = state.left
+        children.reverse()
+        return children
+
+    def expand(self):
+        """
+        Rebuild the completed states skipped along the reduction path, up to the child of this state.
+        """
+        child, (item, above) = self.reduction
+        while above is not None:
+            child = EarleyState(item.rule, item.dot_position + 1, item.sentence_position, self.chart_index,
+                                left=item, child=child)
+            item, above = above
+        self.child = child
+        self.reduction = None
+
+    def pack(self, left, child):
+        if self.alternatives is None:
+            self.alternatives = []
+        self.alternatives.append((left, child))
+
     def next_to_parse(self):
         if self.dot_position < len(self):
             return self.rule[self.dot_position]
@@ -135,14 +124,23 @@ class EarleyState:
         return len(self) == self.dot_position
 
     @staticmethod
-    def init():
-        return EarleyState(Rule(EarleyState.START, [Grammar.get_starting_non_terminal()]))
+    def init(start=None):
+        return EarleyState(Rule(EarleyState.START, [start or Grammar.get_starting_non_terminal()]))
 
 
 class ChartEntry:
+    """
+    States of one chart column, deduplicated through a dict and indexed by the symbol they wait for.
+    """
 
     def __init__(self, states):
-        self.states = states
+        self.states = []
+        self.seen = {}
+        self.waiting = defaultdict(list)
+        # Leo's reduction path above every symbol completed from this column, None when there is none
+        self.reductions = {}
+        for state in states:
+            self.add(state)
 
     def __iter__(self):
         return iter(self.states)
@@ -157,8 +155,17 @@ class ChartEntry:
         return '\n'.join(str(s) for s in self.states)
 
     def add(self, state):
-        if state not in self.states:
+        known = self.seen.get(state)
+        if known is None:
+            self.seen[state] = state
             self.states.append(state)
+            if not state.is_complete():
+                self.waiting[state.next_to_parse()].append(state)
+        elif state.child is not None:
+            known.pack(state.left, state.child)
+
+    def waiting_for(self, symbol):
+        return self.waiting.get(symbol, ())
 
 
 class Chart:
@@ -180,70 +187,365 @@ class Chart:
                             enumerate(self.entries)])
 
     @staticmethod
-    def init(length):
-        return Chart([(ChartEntry([]) if i > 0 else ChartEntry([EarleyState.init()])) for i in range(length)])
+    def init(length, start=None):
+        return Chart([(ChartEntry([]) if i > 0 else ChartEntry([EarleyState.init(start)])) for i in range(length)])
 
 
 class EarleyParse:
+    """
+    Earley parser of the tokens as a `start` nonterminal, by default the start symbol of the grammar.
+    """
 
-    def __init__(self, tokens, grammar):
-        self.grammar = grammar
+    def __init__(self, tokens, grammar, start=None):
+        self.grammar = grammar.compile()
         self.words = tokens
-        self.chart = Chart.init(len(self.words) + 1)
-        self.current_token_index = 0
+        self.start = start or Grammar.get_starting_non_terminal()
+        self.chart = Chart.init(len(self.words) + 1, self.start)
+        # tag of the token after the column being parsed, None at the end of input,
+        # and the rules that scan it
+        self.lookahead = None
+        self.scans = {}
+        self.parsed = False
+        # column whose token nothing scanned in the last parse, the columns after it are empty
+        self.failed = None
+        # whether completed states keep their derivations, see recognize
+        self.derive = True
+        self.references = self.origins = None
 
     def predictor(self, state, pos):
         for rule in self.grammar[state.next_to_parse()]:
-            self.chart[pos].add(EarleyState(rule, dot=0, sent_pos=state.chart_index, chart_pos=state.chart_index))
+            if self.__expects(rule, 0):
+                self.chart[pos].add(EarleyState(rule, dot=0, sent_pos=state.chart_index, chart_pos=state.chart_index))
 
     def scanner(self, state, pos):
-        if state.chart_index < len(self.words):
-            word = str(self.words[state.chart_index].tag)
-            if any((word in r) for r in self.grammar[state.next_to_parse()]):
-                self.chart[pos + 1].add(EarleyState(Rule(state.next_to_parse(), [word]),
-                                                    dot=1, sent_pos=state.chart_index,
-                                                    chart_pos=(state.chart_index + 1)))
+        rule = self.scans.get(state.next_to_parse())
+        if rule is not None:
+            self.chart[pos + 1].add(EarleyState(rule, dot=1, sent_pos=state.chart_index,
+                                                chart_pos=(state.chart_index + 1)))
 
     def completer(self, state, pos):
-        for prev_state in self.chart[state.sentence_position]:
-            if prev_state.next_to_parse() == state.rule.lhs:
+        reduction = self.__reduction(state.rule.lhs, state.sentence_position)
+        if reduction is not None:
+            top, path = reduction
+            leo_state = EarleyState(top.rule, dot=(top.dot_position + 1), sent_pos=top.sentence_position,
+                                    chart_pos=pos, left=top if self.derive or top.rule.operator is not None else None)
+            if self.derive:
+                leo_state.reduction = (state, path)
+            self.chart[pos].add(leo_state)
+            return
+        child = state if self.derive else None
+        for prev_state in self.chart[state.sentence_position].waiting_for(state.rule.lhs):
+            if self.__expects(prev_state.rule, prev_state.dot_position + 1) and self.__ranks(prev_state, state, pos):
+                # precedence finds the operator of a completed state through its left states
+                left = prev_state if child is not None or prev_state.rule.operator is not None else None
                 self.chart[pos].add(EarleyState(prev_state.rule,
                                                 dot=(prev_state.dot_position + 1),
                                                 sent_pos=prev_state.sentence_position,
                                                 chart_pos=pos,
-                                                back_pointers=(prev_state.back_pointers + [state])))
-
-    def __try_find_error(self):
-        for i, chart in enumerate(self.chart):
-            if len(chart) == 0:
-                raise SyntaxAnalyzerError(self.words[i - 1].line)
-                # print(f"Ошибка где-то около {self.words[i - 1].line}")
-                # break
-
-    def __parse(self):
-        for i in range(len(self.chart)):
-            for state in self.chart[i]:
-                if not state.is_complete():
-                    if self.grammar.is_tag(state.next_to_parse()):
-                        self.scanner(state, i)
-                    else:
-                        self.predictor(state, i)
+                                                left=left,
+                                                child=child))
+
+    def __expects(self, rule, dot):
+        """
+        Whether rule.rhs[dot:] can be empty or start with the lookahead token.
+        """
+        if rule.lookahead is None or rule.lookahead[dot] is None:
+            return True
+        return self.lookahead in rule.lookahead[dot]
+
+    def __ranks(self, state, child, pos):
+        """
+        Whether the declared operator precedence lets `state` advance over `child`, completed at `pos`.
+
+        A completed operator rule cannot be the left operand of an operator token that binds tighter,
+        or as tight when that one is not left associative. An operator token cannot become the top of
+        a right operand of one that binds tighter, or as tight when that one is not right associative.
+        """
+        operator = state.rule.operator
+        if operator is None:
+            return True
+        if operator == state.dot_position + 1:
+            if child.rule.operator is None or pos == len(self.words):
+                return True
+            outer, inner = self.__level(pos), self.__level(self.__operator_position(child))
+            return outer is None or inner is None or inner[0] > outer[0] or inner[0] == outer[0] and outer[1] == 'left'
+        if operator == state.dot_position:
+            return self.__fits_operand(state, self.__level(pos - 1))
+        return True
+
+    def __fits_operand(self, state, inner):
+        """
+        Whether an operator of level `inner` may rank a derivation of state's lhs from its origin,
+        given the items that wait for it there.
+        """
+        if inner is None:
+            return True
+        origin = state.sentence_position
+        outer = None
+        for context in self.chart[origin].waiting_for(state.rule.lhs):
+            if context.dot_position == 0 and context.rule.lhs == state.rule.lhs:
+                # a derivation that goes on from here is ranked by its own operator
+                continue
+            operator = context.rule.operator
+            if operator is None or operator != context.dot_position - 1:
+                return True
+            outer = self.__level(origin - 1)
+            if outer is None or inner[0] > outer[0] or inner[0] == outer[0] and outer[1] == 'right':
+                return True
+        return outer is None
+
+    def __level(self, i):
+        """
+        Precedence (level, associativity) of the token at i by its value or else its tag, None when it has none.
+        """
+        if isinstance(self.words, TokenBuffer):
+            value, tag = self.words.value_at(i), self.words.tag_at(i)
+        else:
+            value, tag = self.words[i].value, self.words[i].tag
+        level = self.grammar.levels.get(value)
+        return level if level is not None else self.grammar.levels.get(str(tag))
+
+    @staticmethod
+    def __operator_position(state):
+        """
+        Token position of the operator of a completed operator rule state.
+        """
+        for _ in range(len(state.rule) - 1 - state.rule.operator):
+            state = state.left
+        return state.chart_index - 1
+
+    def __reduction(self, symbol, origin):
+        """
+        Topmost item and path of Leo's deterministic reduction above `symbol` completed from `origin`.
+
+        The path holds the items that wait for the symbol as their last one, one per step, each
+        the only item of its column waiting for it and not ranked by its last symbol, which would
+        bypass precedence. It is a linked (item, rest) list, bottom first.
+        """
+        steps = []
+        entry = self.chart[origin]
+        while symbol not in entry.reductions:
+            waiting = entry.waiting_for(symbol)
+            if len(waiting) != 1 or waiting[0].dot_position + 1 != len(waiting[0]) \
+                    or waiting[0].rule.lhs == EarleyState.START or waiting[0].rule.operator == waiting[0].dot_position:
+                entry.reductions[symbol] = None
+                break
+            steps.append((entry, symbol, waiting[0]))
+            entry, symbol = self.chart[waiting[0].sentence_position], waiting[0].rule.lhs
+
+        reduction = entry.reductions[symbol]
+        for entry, symbol, item in reversed(steps):
+            top = item if reduction is None else reduction[0]
+            reduction = (top, (item, None if reduction is None else reduction[1]))
+            entry.reductions[symbol] = reduction
+        return reduction
+
+    def __key(self, i):
+        """
+        What the chart depends on at token i: its tag and precedence, not its value.
+        """
+        return self.__tag_at(i), self.__level(i)
+
+    def __tag_at(self, i):
+        # a TokenBuffer answers tags without building Token objects
+        if isinstance(self.words, TokenBuffer):
+            return self.words.tag_at(i)
+        return self.words[i].tag
+
+    def __expected(self, pos):
+        """
+        Terminals that the states of column pos could go on with, lookahead filtering aside.
+        """
+        expected = set()
+        completed = []
+        for state in self.chart[pos]:
+            if state.is_complete():
+                completed.append((state.rule.lhs, state.sentence_position))
+            elif self.__first(state.rule, state.dot_position, expected):
+                completed.append((state.rule.lhs, state.sentence_position))
+        seen = set()
+        while completed:
+            symbol, origin = completed.pop()
+            if (symbol, origin) in seen:
+                continue
+            seen.add((symbol, origin))
+            for state in self.chart[origin].waiting_for(symbol):
+                if self.__first(state.rule, state.dot_position + 1, expected):
+                    completed.append((state.rule.lhs, state.sentence_position))
+        return expected
+
+    def __first(self, rule, dot, terminals):
+        """
+        Add the FIRST set of rule.rhs[dot:] to terminals, return whether that rest can be empty.
+        """
+        for symbol in rule.rhs[dot:]:
+            i = self.grammar.ids[symbol]
+            terminals |= self.grammar.first[i]
+            if not self.grammar.nullable[i]:
+                return False
+        return True
+
+    def __release(self, pos):
+        """
+        Drop the columns that no incomplete state of a live column points back to, once pos is parsed.
+
+        A column is live while the next one is parsed, later only while it is the origin of an
+        incomplete state in another live column; origins only point back, so counting them is exact.
+        """
+        origins = {state.sentence_position for state in self.chart[pos] if not state.is_complete()}
+        origins.discard(pos)
+        self.origins[pos] = origins
+        for origin in origins:
+            self.references[origin] += 1
+        dead = [pos - 1] if pos > 0 and self.references[pos - 1] == 0 else []
+        while dead:
+            column = dead.pop()
+            self.chart.entries[column] = None
+            for origin in self.origins[column]:
+                self.references[origin] -= 1
+                if self.references[origin] == 0:
+                    dead.append(origin)
+            self.origins[column] = None
+
+    def __parse(self, start=0, release=False):
+        self.failed = None
+        for i in range(start, len(self.chart)):
+            self.__parse_column(i, release)
+        self.parsed = not release
+
+    def __parse_column(self, i, release=False):
+        self.lookahead = str(self.__tag_at(i)) if i < len(self.words) else None
+        self.scans = self.grammar.scans.get(self.lookahead, {})
+        for state in self.chart[i]:
+            if not state.is_complete():
+                if self.grammar.is_tag(state.next_to_parse()):
+                    self.scanner(state, i)
                 else:
-                    self.completer(state, i)
+                    self.predictor(state, i)
+            else:
+                self.completer(state, i)
+        if i < len(self.words) and len(self.chart[i + 1]) == 0:
+            # nothing scanned the token, no later column can have states
+            token = self.words[i]
+            self.failed = i
+            raise SyntaxAnalyzerError(token.line, token=token, index=i, expected=() if release else self.__expected(i))
+        if release:
+            self.__release(i)
+
+    def feed(self, token):
+        """
+        Parse one more token, as soon as it is known; raises SyntaxAnalyzerError when it cannot follow.
+
+        The token list grows with every fed token and the chart gets a column for it.
+        A column is parsed once the token after it is fed, the last one by `finish`.
+        """
+        self.words.append(token)
+        self.chart.entries.append(ChartEntry([]))
+        self.__parse_column(len(self.words) - 1)
+
+    def finish(self):
+        """
+        Parse tree of the fed tokens, None when they end too early.
+        """
+        self.__parse_column(len(self.words))
+        self.parsed = True
+        return self.__find_tree()
+
+    def build_tree(self, root):
+        """
+        SyntaxTree of the first derivation of a completed state, built without recursion; returns its root.
+
+        Hidden helper nonterminals get no node, their children belong to their parent, so trees keep
+        the labels of the grammar as written. Node kinds are the symbol ids of the grammar.
+        """
+        tree = SyntaxTree(self.words, self.grammar.symbols)
+        stack = [root]
+        while stack:
+            state = stack.pop()
+            if type(state) is int:
+                # a node whose children are all added
+                tree.close(state)
+            elif self.grammar.is_tag(state.rule.lhs):
+                tree.close(tree.open(state.rule.lhs, state.sentence_position, state.chart_index))
+            else:
+                if state.rule.lhs not in self.grammar.hidden:
+                    stack.append(tree.open(state.rule.lhs, state.sentence_position, state.chart_index))
+                stack.extend(reversed(state.back_pointers))
+        return tree.root
+
+    def reparse(self, tokens):
+        """
+        Parse tree of an edited token list, reusing the chart of the previous parse.
+
+        Chart columns before the first token whose tag or precedence changed are kept, the column
+        after it is seeded again by the scanner and the rest is rebuilt. When no token changed that way,
+        as with renamed identifiers or other literals, the old chart lines up with the new tokens
+        and is kept whole. After a syntax error only the columns before the failed one are kept.
+        """
+        if not self.parsed:
+            self.words = tokens
+            self.chart = Chart.init(len(self.words) + 1, self.start)
+            return self.get_parse_tree()
+        old = [self.__key(i) for i in range(len(self.words))]
+        self.words = tokens
+        changed = 0
+        while changed < min(len(old), len(tokens)) and old[changed] == self.__key(changed):
+            changed += 1
+        if self.failed is not None:
+            changed = min(changed, self.failed)
+        if changed == len(old) == len(tokens):
+            logger.debug('reusing the whole chart')
+            return self.__find_tree()
+        logger.debug(f'reusing {changed} of {len(tokens) + 1} chart entries')
+        if changed == 0:
+            self.chart = Chart.init(len(tokens) + 1, self.start)
+            return self.get_parse_tree()
+
+        self.chart = Chart(self.chart.entries[:changed] + [ChartEntry([]) for _ in range(len(tokens) + 1 - changed)])
+        self.lookahead = str(self.__tag_at(changed - 1))
+        self.scans = self.grammar.scans.get(self.lookahead, {})
+        for state in self.chart[changed - 1]:
+            if not state.is_complete() and self.grammar.is_tag(state.next_to_parse()):
+                self.scanner(state, changed - 1)
+        self.__parse(changed)
+        return self.__find_tree()
+
+    def recognize(self):
+        """
+        Whether the tokens parse, without building derivations for a tree.
+
+        States keep no children and chart columns are released as soon as no live state points back
+        to them, so a later parse starts over with a new chart.
+        """
+        self.parsed = False
+        self.derive = False
+        self.references = [0] * len(self.chart)
+        self.origins = [None] * len(self.chart)
+        try:
+            self.__parse(release=True)
+        except SyntaxAnalyzerError:
+            return False
+        return self.__accepted() is not None
 
     def get_parse_tree(self):
-        def build_tree(tree_state):
-            if self.grammar.is_tag(tree_state.rule.lhs):
-                self.current_token_index += 1
-                return Tree(tree_state.rule.lhs, [self.words[self.current_token_index - 1]])
-            return Tree(tree_state.rule.lhs,
-                        [build_tree(s) for s in tree_state.back_pointers])
-
+        if not self.derive:
+            # the chart of a recognition has no derivations and released columns
+            self.chart = Chart.init(len(self.words) + 1, self.start)
+            self.derive = True
+            self.references = self.origins = None
         self.__parse()
-        start = Grammar.get_starting_non_terminal()
+        return self.__find_tree()
+
+    def __accepted(self):
         for state in self.chart[-1]:
-            if state.is_complete() and state.rule.lhs == start \
+            if state.is_complete() and state.rule.lhs == self.start \
                     and state.sentence_position == 0 and state.chart_index == len(self.words):
-                return build_tree(state)
-        self.__try_find_error()
+                return state
         return None
+
+    def __find_tree(self):
+        if logger.isEnabledFor(logging.DEBUG):
+            states = sum(len(entry) for entry in self.chart)
+            logger.debug(f'{states} states, {states / len(self.chart):.1f} per chart entry on average')
+        state = self.__accepted()
+        return self.build_tree(state) if state is not None else None
@@ -0,0 +1,400 @@
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from types import MappingProxyType
+
+from transpiler.constants import GRAMMAR_SNAPSHOT_VERSION, GRAMMAR_SNAPSHOT_DIR, ASSOCIATIVITY
+
+logger = logging.getLogger(__name__)
+
+
+class Rule:
+    """
+    lhs -> rhs
+    rhs = (...)
+
+    `lookahead[dot]`, filled in by CompiledGrammar, holds the terminals that can start rhs[dot:],
+    or None when rhs[dot:] can be empty. `operator` is the index of the preterminal whose token
+    ranks the rule when the grammar declares precedence, None otherwise.
+    """
+
+    def __init__(self, lhs, rhs):
+        self.lhs, self.rhs = lhs, tuple(rhs)
+        self.lookahead = None
+        self.operator = None
+
+    def __eq__(self, other):
+        if type(other) is Rule:
+            return self.lhs == other.lhs and self.rhs == other.rhs
+        return False
+
+    def __hash__(self):
+        return hash((self.lhs, self.rhs))
+
+    def __getitem__(self, i):
+        return self.rhs[i]
+
+    def is_loop(self):
+        return self.rhs == (self.lhs,)
+
+    def __len__(self):
+        return len(self.rhs)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return self.lhs + ' -> ' + ' '.join(self.rhs)
+
+
+class Grammar:
+
+    def __init__(self):
+        self.rules = defaultdict(list)
+        # (associativity, names) from the lowest level to the highest
+        self.precedence = []
+
+    def add(self, rule):
+        self.rules[rule.lhs].append(rule)
+
+    @staticmethod
+    def load_grammar(fpath):
+        with open(fpath) as f:
+            return Grammar.parse(f.read())
+
+    @staticmethod
+    def parse(text):
+        grammar = Grammar()
+        for line in text.splitlines():
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            if line.startswith('%'):
+                directive, *names = line.split()
+                if directive[1:] not in ASSOCIATIVITY:
+                    raise ValueError(f'unknown grammar directive {directive}')
+                grammar.precedence.append((directive[1:], tuple(names)))
+                continue
+            entries = line.split('->')
+            lhs = entries[0].strip()
+            for rhs in entries[1].split(' | '):
+                grammar.add(Rule(lhs, rhs.strip().split()))
+        return grammar
+
+    @staticmethod
+    def get_starting_non_terminal():
+        return '<program>'
+
+    def compile(self, normalize=True):
+        rules = [rule for rules in self.rules.values() for rule in rules]
+        return CompiledGrammar.from_rules(rules, self.precedence, normalize)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        start = self.get_starting_non_terminal()
+        s = [f'%{associativity} {" ".join(names)}' for associativity, names in self.precedence]
+        s += [str(r) for r in self.rules.get(start, [])]
+
+        for nt, rule_list in self.rules.items():
+            if nt == start:
+                continue
+            s += [str(r) for r in rule_list]
+        return '\n'.join(s)
+
+    # Returns the rules for a given Non-terminal.
+    def __getitem__(self, nt):
+        return self.rules.get(nt, [])
+
+    def is_terminal(self, symbol):
+        return len(self[symbol]) == 0
+
+    def is_tag(self, symbol):
+        if not self.is_terminal(symbol):
+            return all(self.is_terminal(s) for r in self[symbol] for s in r.rhs)
+        return False
+
+
+class CompiledGrammar(Grammar):
+    """
+    Grammar with numbered symbols and precomputed tables, never changed after it is built.
+
+    Rules A -> A are dropped: they add nothing to the language and would make every reduction
+    through A ambiguous. Nonterminals get the first ids in order of appearance, terminals follow. `productions` holds
+    every rule as (lhs id, rhs ids), `rules_of[id]` the rules of a symbol, `terminal`,
+    `preterminal` and `nullable` are flags and `first` the FIRST sets indexed by symbol id.
+    `scans[tag][preterminal]` is the shared rule of a token with that tag scanned as the preterminal.
+
+    `precedence` lists (associativity, names) from the lowest level to the highest, a name being
+    a token value such as `+` or a terminal; `levels` maps every name to (level, associativity).
+    `hidden` holds the helper nonterminals of normalization, spliced into their parent in a parse tree.
+    """
+
+    def __init__(self, symbols, productions, terminal, preterminal, nullable, first, precedence=(), hidden=()):
+        self.symbols = tuple(symbols)
+        self.ids = MappingProxyType({symbol: i for i, symbol in enumerate(self.symbols)})
+        self.productions = tuple((lhs, tuple(rhs)) for lhs, rhs in productions)
+        self.terminal = tuple(terminal)
+        self.preterminal = tuple(preterminal)
+        self.nullable = tuple(nullable)
+        self.first = tuple(frozenset(self.symbols[s] for s in terminals) for terminals in first)
+        self.precedence = tuple((associativity, tuple(names)) for associativity, names in precedence)
+        self.levels = MappingProxyType({
+            name: (level, associativity)
+            for level, (associativity, names) in enumerate(self.precedence) for name in names
+        })
+        self.hidden = frozenset(hidden)
+
+        rules_of = [[] for _ in self.symbols]
+        for lhs, rhs in self.productions:
+            rule = Rule(self.symbols[lhs], (self.symbols[s] for s in rhs))
+            rule.lookahead = self.__lookahead(rhs)
+            if self.levels:
+                rule.operator = self.__operator(rhs)
+            rules_of[lhs].append(rule)
+        self.rules_of = tuple(tuple(rules) for rules in rules_of)
+        self.rules = MappingProxyType({
+            symbol: rules for symbol, rules in zip(self.symbols, self.rules_of) if rules
+        })
+
+        scans = defaultdict(dict)
+        for symbol, rules in self.rules.items():
+            if self.preterminal[self.ids[symbol]]:
+                for rule in rules:
+                    for tag in rule.rhs:
+                        scans[tag].setdefault(symbol, rule if rule.rhs == (tag,) else Rule(symbol, (tag,)))
+        self.scans = MappingProxyType({tag: MappingProxyType(rules) for tag, rules in scans.items()})
+
+    @staticmethod
+    def from_rules(rules, precedence=(), normalize=True):
+        rules = [rule for rule in rules if not rule.is_loop()]
+        hidden = ()
+        if normalize:
+            count = len(rules)
+            rules, hidden = normalize_rules(rules)
+            logger.info(f'grammar normalized from {count} to {len(rules)} rules, {len(hidden)} helper nonterminals')
+        symbols = list(dict.fromkeys(rule.lhs for rule in rules))
+        nonterminals = len(symbols)
+        lhs_symbols = set(symbols)
+        symbols += dict.fromkeys(s for rule in rules for s in rule.rhs if s not in lhs_symbols)
+        ids = {symbol: i for i, symbol in enumerate(symbols)}
+        productions = [(ids[rule.lhs], [ids[s] for s in rule.rhs]) for rule in rules]
+
+        terminal = [i >= nonterminals for i in range(len(symbols))]
+        preterminal = [not terminal[i] for i in range(len(symbols))]
+        for lhs, rhs in productions:
+            if not all(terminal[s] for s in rhs):
+                preterminal[lhs] = False
+
+        nullable = [False] * len(symbols)
+        changed = True
+        while changed:
+            changed = False
+            for lhs, rhs in productions:
+                if not nullable[lhs] and all(nullable[s] for s in rhs):
+                    nullable[lhs] = changed = True
+
+        first = [{i} if terminal[i] else set() for i in range(len(symbols))]
+        changed = True
+        while changed:
+            changed = False
+            for lhs, rhs in productions:
+                for s in rhs:
+                    if not first[s] <= first[lhs]:
+                        first[lhs] |= first[s]
+                        changed = True
+                    if not nullable[s]:
+                        break
+        first = [sorted(terminals) for terminals in first]
+
+        return CompiledGrammar(symbols, productions, terminal, preterminal, nullable, first, precedence, hidden)
+
+    @staticmethod
+    def load(fpath, snapshot_dir=None):
+        """
+        Compiled grammar of a file, read from a snapshot of the same content when there is one.
+
+        Snapshots are written to `snapshot_dir`, by default a __pycache__ folder next to the file;
+        a snapshot that cannot be written is silently skipped.
+        """
+        with open(fpath, 'rb') as f:
+            source = f.read()
+        digest = hashlib.sha256(source).hexdigest()
+        if snapshot_dir is None:
+            snapshot_dir = os.path.join(os.path.dirname(fpath), GRAMMAR_SNAPSHOT_DIR)
+        snapshot = os.path.join(snapshot_dir, f'{os.path.basename(fpath)}.{digest[:16]}.json')
+
+        try:
+            with open(snapshot) as f:
+                data = json.load(f)
+            if data['version'] == GRAMMAR_SNAPSHOT_VERSION and data['hash'] == digest:
+                return CompiledGrammar(
+                    data['symbols'], data['productions'], data['terminal'], data['preterminal'], data['nullable'],
+                    data['first'], data['precedence'], data['hidden'],
+                )
+        except (OSError, ValueError, KeyError):
+            pass
+
+        grammar = Grammar.parse(source.decode()).compile()
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            temporary = f'{snapshot}.{os.getpid()}.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(grammar.snapshot(digest), f)
+            os.replace(temporary, snapshot)
+        except OSError:
+            pass
+        return grammar
+
+    def snapshot(self, digest):
+        return {
+            'version': GRAMMAR_SNAPSHOT_VERSION,
+            'hash': digest,
+            'symbols': self.symbols,
+            'productions': self.productions,
+            'terminal': self.terminal,
+            'preterminal': self.preterminal,
+            'nullable': self.nullable,
+            'first': [sorted(self.ids[s] for s in terminals) for terminals in self.first],
+            'precedence': self.precedence,
+            'hidden': sorted(self.hidden),
+        }
+
+    def __reduce__(self):
+        # rebuilt from its tables, as a snapshot is, when sent to another process
+        data = self.snapshot(None)
+        return CompiledGrammar, tuple(data[key] for key in (
+            'symbols', 'productions', 'terminal', 'preterminal', 'nullable', 'first', 'precedence', 'hidden',
+        ))
+
+    def __lookahead(self, rhs):
+        lookahead = [None] * (len(rhs) + 1)
+        terminals = frozenset()
+        nullable = True
+        for dot in reversed(range(len(rhs))):
+            if self.nullable[rhs[dot]]:
+                terminals |= self.first[rhs[dot]]
+            else:
+                terminals, nullable = self.first[rhs[dot]], False
+            lookahead[dot] = None if nullable else terminals
+        return tuple(lookahead)
+
+    def __operator(self, rhs):
+        """
+        Index of the last preterminal of an rhs that also holds a nonterminal, like E -> E op E or L -> ! L.
+        """
+        if all(self.terminal[s] or self.preterminal[s] for s in rhs):
+            return None
+        for i in reversed(range(len(rhs))):
+            if self.preterminal[rhs[i]]:
+                return i
+        return None
+
+    def compile(self, normalize=True):
+        return self
+
+    def add(self, rule):
+        raise TypeError('a compiled grammar cannot be changed')
+
+    def __getitem__(self, nt):
+        i = self.ids.get(nt)
+        return () if i is None else self.rules_of[i]
+
+    def is_terminal(self, symbol):
+        i = self.ids.get(symbol)
+        return i is None or self.terminal[i]
+
+    def is_tag(self, symbol):
+        i = self.ids.get(symbol)
+        return i is not None and self.preterminal[i]
+
+
+def normalize_rules(rules):
+    """
+    Rules without duplicate alternatives and unit cycles, with shared prefixes left-factored.
+
+    Returns the rules and the helper nonterminals left factoring added.
+    """
+    rules = remove_unit_cycles(list(dict.fromkeys(rules)))
+    return left_factor(rules)
+
+
+def remove_unit_cycles(rules):
+    """
+    Rules where no nonterminal derives itself through unit rules A -> B alone.
+
+    A unit rule between members of a cycle is dropped and the other rules of the members are
+    copied to each of them, so every member keeps its language with the shortest derivation.
+    """
+    lhs_symbols = {rule.lhs for rule in rules}
+    units = defaultdict(set)
+    for rule in rules:
+        if len(rule.rhs) == 1 and rule.rhs[0] in lhs_symbols:
+            units[rule.lhs].add(rule.rhs[0])
+    reachable = {}
+    for symbol in units:
+        seen, stack = set(), [symbol]
+        while stack:
+            for target in units.get(stack.pop(), ()):
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        reachable[symbol] = seen
+
+    def in_cycle(a, b):
+        return b in reachable.get(a, ()) and a in reachable.get(b, ())
+
+    kept = [rule for rule in rules if not (len(rule.rhs) == 1 and in_cycle(rule.lhs, rule.rhs[0]))]
+    copies = [
+        Rule(symbol, rule.rhs)
+        for symbol in units for rule in kept if rule.lhs != symbol and in_cycle(symbol, rule.lhs)
+    ]
+    return list(dict.fromkeys(kept + copies))
+
+
+def left_factor(rules):
+    """
+    Rules where alternatives sharing a prefix of two or more symbols are one rule, prefix + helper,
+    the helper deriving what follows the prefix. A prefix with a single nonempty continuation
+    is left as it is, so no helper is ever nullable, and left recursive alternatives are never
+    factored, operator rules keep their shape for precedence.
+    """
+    alternatives = defaultdict(list)
+    for rule in rules:
+        alternatives[rule.lhs].append(rule.rhs)
+    pending = list(alternatives.items())
+    result, helpers = [], []
+    counts = defaultdict(int)
+    while pending:
+        lhs, rhss = pending.pop(0)
+        factored = set()
+        for rhs in rhss:
+            if not rhs or rhs[0] == lhs:
+                result.append(Rule(lhs, rhs))
+                continue
+            if rhs[0] in factored:
+                continue
+            group = [other for other in rhss if other and other[0] == rhs[0]]
+            prefix = group[0]
+            for other in group[1:]:
+                n = 0
+                while n < min(len(prefix), len(other)) and prefix[n] == other[n]:
+                    n += 1
+                prefix = prefix[:n]
+            suffixes = [other[len(prefix):] for other in group]
+            if len(prefix) < 2 or sum(1 for suffix in suffixes if suffix) < 2:
+                result.append(Rule(lhs, rhs))
+                continue
+            factored.add(rhs[0])
+            counts[lhs] += 1
+            helper = f'{lhs[:-1]}~{counts[lhs]}>' if lhs.endswith('>') else f'{lhs}~{counts[lhs]}'
+            helpers.append(helper)
+            factored_rules = [Rule(lhs, prefix + (helper,))]
+            if () in suffixes:
+                factored_rules.insert(0 if suffixes[0] == () else 1, Rule(lhs, prefix))
+            result += factored_rules
+            pending.append((helper, [suffix for suffix in suffixes if suffix]))
+    return result, helpers
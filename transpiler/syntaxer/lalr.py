@@ -0,0 +1,325 @@
+import threading
+from collections import defaultdict
+
+from transpiler.base import TokenBuffer
+from transpiler.constants import Special
+from transpiler.syntaxer.cst import SyntaxTree
+from transpiler.syntaxer.earley import SyntaxAnalyzerError
+from transpiler.syntaxer.grammar import Grammar
+
+SHIFT, REDUCE, ACCEPT = range(3)
+# lookahead that stands for "whatever follows the kernel item" while lookaheads are propagated
+PROPAGATED = -1
+
+_cache: dict[tuple, 'LALRTables | GrammarConflictError'] = {}
+_cache_lock = threading.Lock()
+
+
+class GrammarConflictError(Exception):
+    """
+    Conflicts left in the LALR(1) tables of a grammar after precedence resolution.
+    """
+
+    def __init__(self, conflicts: list[str]):
+        super().__init__(conflicts)
+        self.conflicts = conflicts
+
+    def __str__(self):
+        return f'grammar is not LALR(1), {len(self.conflicts)} conflicts, first: {self.conflicts[0]}'
+
+
+class LALRTables:
+    """
+    LALR(1) action and goto tables of a compiled grammar.
+
+    The LR(0) automaton is built first, then lookaheads are generated and propagated between
+    kernel items. `precedence` lists (associativity, symbols) from the lowest level to the highest,
+    yacc style; a rule takes the precedence of its last symbol that has one, and a preterminal
+    that of its terminal. Conflicts that precedence does not resolve raise GrammarConflictError.
+    """
+
+    def __init__(self, grammar, precedence=()):
+        self.grammar = grammar
+        self.end = len(grammar.symbols)
+        start = self.end + 1
+        program = grammar.ids[Grammar.get_starting_non_terminal()]
+        self.productions = grammar.productions + ((start, (program,)),)
+        self.accept_rule = len(self.productions) - 1
+        self.terminal = grammar.terminal + (True, False)
+        self.rules_of = [[] for _ in range(start + 1)]
+        for rule, (lhs, _) in enumerate(self.productions):
+            self.rules_of[lhs].append(rule)
+
+        nullable = grammar.nullable + (False, False)
+        first = [frozenset(grammar.ids[t] for t in terminals) for terminals in grammar.first]
+        first += [frozenset((self.end,)), frozenset()]
+        # FIRST set and nullability of rhs[dot:] for every item
+        self.tails = {}
+        for rule, (_, rhs) in enumerate(self.productions):
+            terminals, empty = frozenset(), True
+            for dot in reversed(range(len(rhs) + 1)):
+                self.tails[rule, dot] = (terminals, empty)
+                if dot:
+                    terminals = first[rhs[dot - 1]] | terminals if nullable[rhs[dot - 1]] else first[rhs[dot - 1]]
+                    empty = empty and nullable[rhs[dot - 1]]
+
+        self.__build_automaton()
+        self.__build_lookaheads()
+        self.__build_actions(precedence)
+
+    def __predicted(self, symbol):
+        rules = []
+        seen = {symbol}
+        stack = [symbol]
+        while stack:
+            for rule in self.rules_of[stack.pop()]:
+                rules.append(rule)
+                rhs = self.productions[rule][1]
+                if rhs and not self.terminal[rhs[0]] and rhs[0] not in seen:
+                    seen.add(rhs[0])
+                    stack.append(rhs[0])
+        return rules
+
+    def __closure(self, kernel):
+        items = list(kernel)
+        expected = {self.productions[rule][1][dot] for rule, dot in kernel if dot < len(self.productions[rule][1])}
+        predicted = dict.fromkeys(rule for symbol in expected if not self.terminal[symbol]
+                                  for rule in self.predictions[symbol])
+        items.extend((rule, 0) for rule in predicted if (rule, 0) not in kernel)
+        return items
+
+    def __build_automaton(self):
+        self.predictions = [self.__predicted(symbol) if not self.terminal[symbol] else []
+                            for symbol in range(self.end + 2)]
+        self.kernels = [frozenset({(self.accept_rule, 0)})]
+        self.gotos = []
+        index = {self.kernels[0]: 0}
+        state = 0
+        while state < len(self.kernels):
+            transitions = defaultdict(set)
+            for rule, dot in self.__closure(self.kernels[state]):
+                rhs = self.productions[rule][1]
+                if dot < len(rhs):
+                    transitions[rhs[dot]].add((rule, dot + 1))
+            goto = {}
+            for symbol, kernel in transitions.items():
+                kernel = frozenset(kernel)
+                if kernel not in index:
+                    index[kernel] = len(self.kernels)
+                    self.kernels.append(kernel)
+                goto[symbol] = index[kernel]
+            self.gotos.append(goto)
+            state += 1
+
+    def __spread(self, item):
+        """
+        LR(1) closure of a kernel item with the PROPAGATED lookahead.
+        """
+        lookaheads = {item: {PROPAGATED}}
+        stack = [item]
+        while stack:
+            rule, dot = stack.pop()
+            rhs = self.productions[rule][1]
+            if dot >= len(rhs) or self.terminal[rhs[dot]]:
+                continue
+            terminals, empty = self.tails[rule, dot + 1]
+            follow = terminals | lookaheads[rule, dot] if empty else terminals
+            for predicted in self.rules_of[rhs[dot]]:
+                known = lookaheads.setdefault((predicted, 0), set())
+                if not follow <= known:
+                    known |= follow
+                    stack.append((predicted, 0))
+        return lookaheads
+
+    def __build_lookaheads(self):
+        # lookaheads of kernel items and of empty rules, by (state, item)
+        self.lookaheads = defaultdict(set)
+        self.lookaheads[0, (self.accept_rule, 0)].add(self.end)
+        propagation = defaultdict(list)
+        spreads = {}
+        for state, kernel in enumerate(self.kernels):
+            for item in kernel:
+                if item not in spreads:
+                    spreads[item] = self.__spread(item)
+                for (rule, dot), terminals in spreads[item].items():
+                    rhs = self.productions[rule][1]
+                    target = (self.gotos[state][rhs[dot]], (rule, dot + 1)) if dot < len(rhs) else (state, (rule, dot))
+                    for terminal in terminals:
+                        if terminal == PROPAGATED:
+                            propagation[state, item].append(target)
+                        else:
+                            self.lookaheads[target].add(terminal)
+
+        stack = list(self.lookaheads)
+        while stack:
+            source = stack.pop()
+            for target in propagation[source]:
+                if not self.lookaheads[source] <= self.lookaheads[target]:
+                    self.lookaheads[target] |= self.lookaheads[source]
+                    stack.append(target)
+
+    def __build_actions(self, precedence):
+        symbols = self.grammar.symbols + (Special.LIMITER.value, Special.START.value)
+        levels = {}
+        for level, (associativity, names) in enumerate(precedence):
+            for name in names:
+                levels[name] = (level, associativity)
+        for symbol, rules in self.grammar.rules.items():
+            if self.grammar.is_tag(symbol) and symbol not in levels:
+                ranked = [levels[terminal] for rule in rules for terminal in rule.rhs if terminal in levels]
+                if ranked:
+                    levels[symbol] = ranked[-1]
+
+        def rule_level(rule):
+            ranked = [levels[symbols[s]] for s in self.productions[rule][1] if symbols[s] in levels]
+            return ranked[-1] if ranked else None
+
+        reductions = defaultdict(list)
+        for (state, (rule, dot)), terminals in self.lookaheads.items():
+            if dot == len(self.productions[rule][1]):
+                reductions[state].append((rule, terminals))
+
+        self.actions = []
+        conflicts = []
+        for state, goto in enumerate(self.gotos):
+            actions = {symbols[s]: (SHIFT, target) for s, target in goto.items() if self.terminal[s]}
+            for rule, terminals in reductions[state]:
+                for terminal in terminals:
+                    name = symbols[terminal]
+                    action = (ACCEPT, rule) if rule == self.accept_rule else (REDUCE, rule)
+                    known = actions.get(name)
+                    if known is None:
+                        actions[name] = action
+                    elif known[0] == SHIFT and name in levels and rule_level(rule) is not None:
+                        (level, associativity), rule_rank = levels[name], rule_level(rule)[0]
+                        if rule_rank > level or rule_rank == level and associativity == 'left':
+                            actions[name] = action
+                        elif rule_rank == level and associativity == 'nonassoc':
+                            del actions[name]
+                    elif known != action:
+                        conflicts.append(f'state {state} on {name}: {self.__describe(known)} / {self.__describe(action)}')
+            self.actions.append(actions)
+        if conflicts:
+            raise GrammarConflictError(conflicts)
+
+    def __describe(self, action):
+        kind, value = action
+        if kind == SHIFT:
+            return f'shift {value}'
+        lhs, rhs = self.productions[value]
+        symbols = self.grammar.symbols + (Special.LIMITER.value, Special.START.value)
+        return f'reduce {symbols[lhs]} -> {" ".join(symbols[s] for s in rhs)}'
+
+
+def get_tables(grammar, precedence=()) -> LALRTables:
+    """
+    LALR(1) tables of a compiled grammar, built once per process; raises GrammarConflictError.
+    """
+    key = (grammar.symbols, grammar.productions, tuple((associativity, tuple(names)) for associativity, names in precedence))
+    tables = _cache.get(key)
+    if tables is None:
+        with _cache_lock:
+            tables = _cache.get(key)
+            if tables is None:
+                try:
+                    tables = LALRTables(grammar, precedence)
+                except GrammarConflictError as error:
+                    tables = error
+                _cache[key] = tables
+    if isinstance(tables, GrammarConflictError):
+        raise tables
+    return tables
+
+
+class LALRParse:
+    """
+    Linear shift-reduce parser over LALR(1) tables, with the same trees as EarleyParse.
+    """
+
+    def __init__(self, tokens, grammar, tables=None):
+        self.grammar = grammar.compile()
+        self.words = tokens
+        self.tables = tables if tables is not None else get_tables(self.grammar, self.grammar.precedence)
+        self.states = [0]
+        # shifted token indices and reduced (label, first, last, children) nodes, with the first token of each
+        self.trees = []
+        self.firsts = []
+
+    def __tag_at(self, i):
+        if isinstance(self.words, TokenBuffer):
+            return self.words.tag_at(i)
+        return self.words[i].tag
+
+    def __advance(self, i):
+        """
+        Reduce on the token at i, or the end of input after the last token, then shift it.
+
+        Returns the tree once the end of input is accepted, None when the tokens end too early.
+        """
+        actions, gotos = self.tables.actions, self.tables.gotos
+        productions, symbols = self.tables.productions, self.grammar.symbols
+        states, trees, firsts = self.states, self.trees, self.firsts
+        tag = str(self.__tag_at(i)) if i < len(self.words) else Special.LIMITER.value
+        while True:
+            action = actions[states[-1]].get(tag)
+            if action is None:
+                if i < len(self.words):
+                    expected = (name for name in actions[states[-1]] if name != Special.LIMITER.value)
+                    raise SyntaxAnalyzerError(self.words[i].line, token=self.words[i], index=i, expected=expected)
+                return None
+            kind, value = action
+            if kind == SHIFT:
+                states.append(value)
+                trees.append(i)
+                firsts.append(i)
+                return None
+            elif kind == REDUCE:
+                lhs, rhs = productions[value]
+                children = []
+                for child in trees[len(trees) - len(rhs):]:
+                    # a hidden helper is a plain list of the children to splice into its parent
+                    if type(child) is list:
+                        children += child
+                    else:
+                        children.append(child)
+                first = firsts[len(firsts) - len(rhs)] if rhs else i
+                del trees[len(trees) - len(rhs):]
+                del firsts[len(firsts) - len(rhs):]
+                del states[len(states) - len(rhs):]
+                trees.append(children if symbols[lhs] in self.grammar.hidden else (symbols[lhs], first, i, children))
+                firsts.append(first)
+                states.append(gotos[states[-1]][lhs])
+            else:
+                return self.__build_tree(trees[0])
+
+    def __build_tree(self, root):
+        """
+        SyntaxTree of the nested nodes of a parse, in pre-order; returns its root.
+        """
+        tree = SyntaxTree(self.words, self.grammar.symbols)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if type(node) is int:
+                tree.close(node)
+            else:
+                label, first, last, children = node
+                stack.append(tree.open(label, first, last))
+                # tokens are spanned by their node, only child nodes are added
+                stack.extend(child for child in reversed(children) if type(child) is tuple)
+        return tree.root
+
+    def feed(self, token):
+        """
+        Shift one more token, reducing what it completes; raises SyntaxAnalyzerError when it cannot follow.
+        """
+        self.words.append(token)
+        self.__advance(len(self.words) - 1)
+
+    def finish(self):
+        return self.__advance(len(self.words))
+
+    def get_parse_tree(self):
+        for i in range(len(self.words)):
+            self.__advance(i)
+        return self.finish()
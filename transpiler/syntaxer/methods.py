@@ -0,0 +1,148 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from transpiler.constants import Tag, Label, PARALLEL_PARSE_THRESHOLD
+from transpiler.syntaxer.cst import SyntaxTree
+from transpiler.syntaxer.earley import EarleyParse, Grammar, SyntaxAnalyzerError
+
+logger = logging.getLogger(__name__)
+
+# tokens of `public class Main {` before the first method
+HEADER_LENGTH = 4
+
+_grammar = None
+
+
+class MethodParse:
+    """
+    Earley parse of a program split at its top-level methods, each parsed as a `<func_declaration>`
+    or `<main_func>` in a process pool and stitched into the `<program>` tree of a whole parse.
+
+    Methods are found by a balanced-brace scan of the class body. Programs shorter than `threshold`
+    tokens, with fewer than two methods or that do not split this way, and programs with a method
+    that does not parse alone, are parsed whole, so trees and errors are those of EarleyParse.
+    """
+
+    def __init__(self, tokens, grammar, max_workers=None, threshold=PARALLEL_PARSE_THRESHOLD):
+        self.grammar = grammar.compile()
+        self.words = tokens
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.threshold = threshold
+
+    def __split(self):
+        """
+        Token ranges of the top-level methods, None when the tokens are not a class of methods.
+        """
+        if not isinstance(self.words, list) or len(self.words) <= HEADER_LENGTH \
+                or self.words[HEADER_LENGTH - 1].tag != Tag.LBRACKET_CURLY:
+            return None
+        methods = []
+        start, depth = HEADER_LENGTH, 0
+        for i in range(HEADER_LENGTH, len(self.words) - 1):
+            tag = self.words[i].tag
+            if tag == Tag.LBRACKET_CURLY:
+                depth += 1
+            elif tag == Tag.RBRACKET_CURLY:
+                depth -= 1
+                if depth < 0:
+                    return None
+                if depth == 0:
+                    methods.append((start, i + 1))
+                    start = i + 1
+        if depth != 0 or start != len(self.words) - 1 or self.words[-1].tag != Tag.RBRACKET_CURLY:
+            return None
+        return methods
+
+    def __label(self, start, end):
+        main = end - start > 3 and self.words[start + 3].tag == Tag.MAIN
+        return Label.MAIN_FUNC.value if main else Label.FUNC_DECL.value
+
+    def __stitch(self, methods, trees):
+        """
+        `<program>` tree over the method trees, None when no rule of the grammar derives it.
+
+        Declarations next to each other nest, as <func_declaration> is right recursive.
+        """
+        labels = []
+        for tree in trees:
+            if not labels or not tree.label() == Label.FUNC_DECL.value == labels[-1]:
+                labels.append(tree.label())
+        tokens = self.words[:HEADER_LENGTH] + self.words[-1:]
+        for rhs in written_rules(self.grammar, Grammar.get_starting_non_terminal()):
+            preterminals = rhs[:HEADER_LENGTH] + rhs[len(rhs) - 1:]
+            if rhs[HEADER_LENGTH:-1] == tuple(labels) and len(preterminals) == len(tokens) \
+                    and all(symbol in self.grammar.scans.get(str(token.tag), ())
+                            for symbol, token in zip(preterminals, tokens)):
+                break
+        else:
+            return None
+        program = SyntaxTree(self.words, self.grammar.symbols)
+        root = program.open(Grammar.get_starting_non_terminal(), 0, len(self.words))
+        for i, symbol in enumerate(preterminals[:HEADER_LENGTH]):
+            program.close(program.open(symbol, i, i + 1))
+        chain = []
+        for (start, end), tree in zip(methods, trees):
+            node = program.graft(tree.tree, tree.index, start)
+            if tree.label() != Label.FUNC_DECL.value:
+                chain = []
+            # the declarations before this one in a row end where it ends
+            for declaration in chain:
+                program.ends[declaration] = len(program)
+                program.lasts[declaration] = end
+            if tree.label() == Label.FUNC_DECL.value:
+                chain.append(node)
+        program.close(program.open(preterminals[-1], len(self.words) - 1, len(self.words)))
+        program.close(root)
+        return program.root
+
+    def feed(self, token):
+        # methods are split on the whole token list, so nothing is parsed before finish
+        self.words.append(token)
+
+    def finish(self):
+        return self.get_parse_tree()
+
+    def get_parse_tree(self):
+        methods = self.__split() if len(self.words) >= self.threshold and self.max_workers > 1 else None
+        if methods is not None and len(methods) > 1:
+            with ProcessPoolExecutor(min(self.max_workers, len(methods)), initializer=_init_worker,
+                                     initargs=(self.grammar,)) as executor:
+                trees = list(executor.map(_parse_method, [
+                    (self.words[start:end], self.__label(start, end)) for start, end in methods
+                ]))
+            if all(tree is not None for tree in trees):
+                tree = self.__stitch(methods, trees)
+                if tree is not None:
+                    return tree
+            logger.debug('methods do not parse alone, parsing the whole program')
+        return EarleyParse(self.words, self.grammar).get_parse_tree()
+
+
+def written_rules(grammar, symbol):
+    """
+    Right hand sides of a symbol with the hidden helpers of normalization expanded, as the grammar was written.
+    """
+    rules = []
+    stack = [rule.rhs for rule in grammar[symbol]]
+    while stack:
+        rhs = stack.pop()
+        helper = next((i for i, s in enumerate(rhs) if s in grammar.hidden), None)
+        if helper is None:
+            rules.append(rhs)
+        else:
+            stack.extend(rhs[:helper] + rule.rhs + rhs[helper + 1:] for rule in grammar[rhs[helper]])
+    return rules
+
+
+def _init_worker(grammar):
+    global _grammar
+    _grammar = grammar
+
+
+def _parse_method(task):
+    tokens, start = task
+    try:
+        return EarleyParse(tokens, _grammar, start).get_parse_tree()
+    except SyntaxAnalyzerError:
+        return None